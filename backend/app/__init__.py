@@ -1,19 +1,80 @@
 # app/__init__.py
+import orjson
 from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_migrate import Migrate
+from sqlalchemy import event
 from config import config
 import os
 IS_MIGRATING = os.environ.get('IS_MIGRATING') == '1'
 
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, so every jsonify() call serializes in C."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+# SQLite PRAGMAs applied to every new connection. WAL + synchronous=NORMAL
+# avoids an fsync per committed page, roughly doubling write throughput on
+# the rule/segment write paths.
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "cache_size=-64000",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+    "foreign_keys=ON",
+)
+
 # Initialize extensions without importing models
 db = SQLAlchemy()
 cors = CORS()
 migrate = Migrate()
 
+# One-shot guard so repeated create_app() calls in the same process (e.g. the
+# scheduler's per-rule app instances) don't re-run schema creation.
+_SCHEMA_READY = False
+
+# Static payload for the root endpoint; built once at import instead of on
+# every request.
+_INDEX_PAYLOAD = {
+    'name': 'Audience Manager API',
+    'version': '1.0.0',
+    'endpoints': {
+        'health': '/api/v1/health',
+        'transactions': {
+            'list_upi': '/api/v1/transactions/upi',
+            'list_credit_card': '/api/v1/transactions/credit-card'
+        },
+        'analytics': {
+            'category_totals': '/api/v1/analytics/category-totals',
+            'daily_totals': '/api/v1/analytics/daily-totals',
+            'summary': '/api/v1/analytics/summary',
+            'users': '/api/v1/analytics/users'
+        },
+        'segments': {
+            'list': '/api/v1/segments',
+            'by_rule': '/api/v1/segments/rule/<int:rule_id>',
+            'detail': '/api/v1/segments/<int:segment_id>',
+            'refresh': '/api/v1/segments/<int:segment_id>/refresh'
+        },
+        'rules': {
+            'list': '/api/v1/rules',
+            'detail': '/api/v1/rules/<int:rule_id>',
+            'trigger': '/api/v1/rules/<int:rule_id>/trigger'
+        }
+    }
+}
+
 def create_app(config_name='default'):
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
     app.config.from_object(config[config_name])
     
     # Initialize extensions
@@ -27,53 +88,55 @@ def create_app(config_name='default'):
         from .api import api_bp
         from .core.scheduler import init_scheduler
         
-        # Ensure tables exist after models are imported
+        # Ensure tables exist after models are imported; only the first
+        # create_app() in the process pays the CREATE TABLE/reflection cost.
+        global _SCHEMA_READY
         with app.app_context():
-            db.create_all()
-        
+            @event.listens_for(db.engine, "connect")
+            def _sqlite_pragmas(dbapi_conn, _):
+                cur = dbapi_conn.cursor()
+                for pragma in SQLITE_PRAGMAS:
+                    cur.execute(f"PRAGMA {pragma}")
+                cur.close()
+
+            if not _SCHEMA_READY:
+                db.create_all()
+                _SCHEMA_READY = True
+
+        @app.teardown_appcontext
+        def _optimize_sqlite(exception=None):
+            # Keep the query planner's index statistics fresh; near-zero
+            # cost when the schema is stable.
+            try:
+                from sqlalchemy import text
+                db.session.execute(text("PRAGMA optimize"))
+            except Exception:
+                # Harmless if the schema changed mid-request or the
+                # session is already torn down.
+                pass
+
         # Register blueprints
         app.register_blueprint(api_bp, url_prefix='/api/v1')
         
-        # Initialize scheduler in non-testing environments
+        # Initialize scheduler in non-testing environments. Done from a
+        # background thread so worker boot isn't blocked on rescheduling
+        # every active rule.
         if not app.config.get('TESTING') and not IS_MIGRATING:
-            try:
-                init_scheduler(app)
-            except Exception as e:
-                app.logger.error(f"Failed to initialize scheduler: {str(e)}")
-                app.logger.info("Continuing without scheduler...")
+            def _start_scheduler():
+                try:
+                    init_scheduler(app)
+                except Exception as e:
+                    app.logger.error(f"Failed to initialize scheduler: {str(e)}")
+                    app.logger.info("Continuing without scheduler...")
+
+            import threading
+            threading.Thread(target=_start_scheduler, name='scheduler-init', daemon=True).start()
         
         # Root endpoint
         @app.route('/')
         def index():
-            return jsonify({
-                'name': 'Audience Manager API',
-                'version': '1.0.0',
-                'endpoints': {
-                    'health': '/api/v1/health',
-                    'transactions': {
-                        'list_upi': '/api/v1/transactions/upi',
-                        'list_credit_card': '/api/v1/transactions/credit-card'
-                    },
-                    'analytics': {
-                        'category_totals': '/api/v1/analytics/category-totals',
-                        'daily_totals': '/api/v1/analytics/daily-totals',
-                        'summary': '/api/v1/analytics/summary',
-                        'users': '/api/v1/analytics/users'
-                    },
-                    'segments': {
-                        'list': '/api/v1/segments',
-                        'by_rule': '/api/v1/segments/rule/<int:rule_id>',
-                        'detail': '/api/v1/segments/<int:segment_id>',
-                        'refresh': '/api/v1/segments/<int:segment_id>/refresh'
-                    },
-                    'rules': {
-                        'list': '/api/v1/rules',
-                        'detail': '/api/v1/rules/<int:rule_id>',
-                        'trigger': '/api/v1/rules/<int:rule_id>/trigger'
-                    }
-                }
-            })
-        
+            return jsonify(_INDEX_PAYLOAD)
+
         return app
         
     except Exception as e:
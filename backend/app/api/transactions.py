@@ -4,23 +4,30 @@ from ..utils.database import db_manager
 from . import api_bp
 from ..utils.response import paginated_response
 
+# Column tuples resolved once at import; listing pages query these directly
+# so rows come back as plain tuples instead of hydrated model instances.
+_UPI_COLS = tuple(UPITransaction.__table__.c)
+_CC_COLS = tuple(CreditCardPayment.__table__.c)
+
 @api_bp.route('/transactions/upi', methods=['GET'])
 def get_upi_transactions():
-    """Get paginated list of UPI transactions."""
-    page = request.args.get('page', 1, type=int)
+    """Get keyset-paginated list of UPI transactions."""
+    after_id = request.args.get('after_id', 0, type=int)
     per_page = request.args.get('per_page', 10, type=int)
-    
-    query = UPITransaction.query
-    return jsonify(paginated_response(query, page=page, per_page=per_page))
+
+    query = UPITransaction.query.with_entities(*_UPI_COLS)
+    return jsonify(paginated_response(query, UPITransaction.id,
+                                      after_id=after_id, per_page=per_page))
 
 @api_bp.route('/transactions/credit-card', methods=['GET'])
 def get_credit_card_transactions():
-    """Get paginated list of credit card transactions."""
-    page = request.args.get('page', 1, type=int)
+    """Get keyset-paginated list of credit card transactions."""
+    after_id = request.args.get('after_id', 0, type=int)
     per_page = request.args.get('per_page', 10, type=int)
-    
-    query = CreditCardPayment.query
-    return jsonify(paginated_response(query, page=page, per_page=per_page))
+
+    query = CreditCardPayment.query.with_entities(*_CC_COLS)
+    return jsonify(paginated_response(query, CreditCardPayment.id,
+                                      after_id=after_id, per_page=per_page))
 
 @api_bp.route('/transactions/upi/<int:transaction_id>', methods=['GET'])
 def get_upi_transaction(transaction_id):
@@ -1,16 +1,22 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
 import logging
-from app.processor.spark_processor import SparkSegmentProcessor
-import subprocess
-import os
+from concurrent.futures import ThreadPoolExecutor
 from pytz import utc
 
+from sqlalchemy import update
+
+from app.processor.spark_processor import SparkSegmentProcessor
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
 scheduler = BackgroundScheduler(timezone=utc)
 
+# Executions run off the dispatcher thread so one slow Spark job doesn't
+# delay the rest of the due batch.
+_dispatch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='rule-exec')
+
 def init_scheduler(app):
     """Initialize the scheduler with the app context"""
     if scheduler.running:
@@ -19,118 +25,136 @@ def init_scheduler(app):
 
     scheduler.app = app
     scheduler.start()
-    
+
     # Import here to avoid circular imports
     from ..models.rule_engine import Rule
-    
-    # Schedule all active rules
+    from app import db
+
+    # Backfill next_run_at so the dispatcher picks every active rule up;
+    # one UPDATE replaces the per-rule load/save loop. One-shot rules that
+    # already ran stay un-armed, so a restart doesn't re-fire them.
     with app.app_context():
-        rules = Rule.query.filter_by(is_active=True).all()
-        for rule in rules:
-            if not rule.next_run_at or rule.next_run_at < datetime.utcnow():
-                rule.next_run_at = datetime.utcnow()
-                rule.save()
-            schedule_rule(rule.id)
+        Rule.query.filter(Rule.is_active == True, Rule.next_run_at.is_(None),
+                          db.or_(Rule.schedule != 'once',
+                                 Rule.last_run_at.is_(None))) \
+            .update({'next_run_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+    # A single periodic dispatcher replaces one APScheduler date job per
+    # rule: scheduler state stays constant-size however many rules exist,
+    # and due rules are found with one indexed query (ix_rule_active_next).
+    scheduler.add_job(
+        dispatch_due_rules,
+        'interval',
+        seconds=30,
+        id='rule_dispatcher',
+        replace_existing=True
+    )
+
+    # Periodically refresh SQLite planner statistics
+    scheduler.add_job(
+        run_pragma_optimize,
+        'interval',
+        hours=4,
+        id='sqlite_optimize',
+        replace_existing=True
+    )
+
+def dispatch_due_rules():
+    """Find every active rule whose next_run_at has passed and execute it."""
+    from app import db
+    from app.models import Rule
+
+    app = getattr(scheduler, 'app', None)
+    if app is None:
+        return
+
+    with app.app_context():
+        now = datetime.utcnow()
+        due = (db.session.query(Rule.id, Rule.schedule)
+               .filter(Rule.is_active == True, Rule.next_run_at <= now)
+               .all())
+        # Advance next_run_at up front so a long execution (or a crash
+        # mid-run) can't make the next tick dispatch the same rule again.
+        # One-shot rules are done after this dispatch: clearing
+        # next_run_at retires them instead of defaulting to daily.
+        for rule_id, schedule in due:
+            next_run = None if schedule == 'once' else calculate_next_run(schedule)
+            Rule.query.filter_by(id=rule_id).update(
+                {'next_run_at': next_run},
+                synchronize_session=False)
+        if due:
+            db.session.commit()
+
+    for rule_id, _ in due:
+        _dispatch_executor.submit(execute_rule, rule_id)
+
+def run_pragma_optimize():
+    """Run PRAGMA optimize so the query planner works with fresh index stats."""
+    from sqlalchemy import text
+    from app import db
+
+    app = getattr(scheduler, 'app', None)
+    if app is None:
+        return
+    with app.app_context():
+        try:
+            db.session.execute(text("PRAGMA optimize"))
+            db.session.commit()
+        except Exception as e:
+            # "schema has changed" mid-run is harmless; just log and retry next cycle.
+            logger.warning(f"PRAGMA optimize skipped: {e}")
 
 def remove_scheduled_rule(rule_id: int):
-    """Remove a scheduled job for a given rule ID."""
-    job_id = f'rule_{rule_id}'
-    try:
-        scheduler.remove_job(job_id)
-        logger.info(f"Removed job {job_id} from scheduler.")
-    except Exception as e:
-        # It's possible the job doesn't exist, which is fine.
-        logger.warning(f"Could not remove job {job_id}. It might not exist. Error: {e}")
+    """Stop a rule from being dispatched.
+
+    There is no per-rule job to cancel anymore; the dispatcher query skips
+    rules that are deleted or inactive, so this only logs for visibility.
+    """
+    logger.info(f"Rule {rule_id} removed from dispatch (dispatcher skips inactive/deleted rules).")
 
 def schedule_rule(rule_id: int):
-    """Schedule a rule to run at its next scheduled time"""
+    """Make a rule eligible for the periodic dispatcher.
+
+    Rules are picked up by next_run_at, so this only backfills the
+    timestamp when unset; no APScheduler job is created per rule.
+    """
     from ..models.rule_engine import Rule
-    
+
     rule = Rule.query.get(rule_id)
     if not rule or not rule.is_active:
         return
-    
-    scheduler.add_job(
-        execute_rule,
-        'date',
-        run_date=rule.next_run_at,
-        args=[rule.id],
-        id=f'rule_{rule.id}',
-        replace_existing=True
-    )
+    if not rule.next_run_at:
+        rule.next_run_at = datetime.utcnow()
+        rule.save()
 
 def execute_rule(rule_id: int):
     """The function that gets executed by the scheduler."""
     from app import create_app, db
     from app.models import Rule
 
-    app = create_app()
+    app = getattr(scheduler, 'app', None) or create_app()
     with app.app_context():
         try:
             logger.info(f"Executing rule {rule_id}")
 
-            # Use 'spark-submit' and assume it's in the PATH. The environment will be configured below.
-            spark_submit_cmd = "spark-submit"
-
-            # Construct absolute path to the Spark job script
-            app_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-            spark_job_path = os.path.join(app_dir, 'jobs', 'segment_processor_job.py')
-
-            # Construct absolute path to the JAR file
-            backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-            jar_path = os.path.join(backend_dir, 'jars', 'sqlite-jdbc-3.45.3.0.jar')
-
-            logger.info(f"Submitting Spark job with JAR: {jar_path}")
-
-            db_uri = app.config.get('SQLALCHEMY_DATABASE_URI')
-            if not db_uri:
-                logger.error("SQLALCHEMY_DATABASE_URI is not configured in the Flask app.")
-                return False
+            # Run the processor in-process; it defaults to the module-wide
+            # shared Spark session instead of shelling out per rule.
+            processor = SparkSegmentProcessor(db.session, rule_id)
+            success = processor.process()
 
-            cmd = [
-                spark_submit_cmd,
-                '--master', 'local[*]',
-                '--jars', jar_path,
-                '--driver-class-path', jar_path,
-                spark_job_path,
-                str(rule_id),
-                db_uri
-            ]
-
-            logger.debug(f"Running command: {' '.join(cmd)}")
-
-            # Set environment variables for the Spark job
-            env = os.environ.copy()
-
-            # Set SPARK_HOME to the correct path provided by the user.
-            spark_home = '/opt/spark-3.5'
-            env['SPARK_HOME'] = spark_home
-            logger.info(f"Explicitly setting SPARK_HOME for subprocess: {spark_home}")
-            python_path = env.get('PYTHONPATH', '')
-            # The project root is 'backend_dir', which is two levels up from this file's directory.
-            env['PYTHONPATH'] = f"{backend_dir}:{python_path}" if python_path else backend_dir
-            logger.debug(f"Using PYTHONPATH for Spark job: {env['PYTHONPATH']}")
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=False, env=env)
-
-            # Always log stdout and stderr for debugging purposes
-            if result.stdout:
-                logger.info(f"Spark Job STDOUT for rule {rule_id}:\n{result.stdout}")
-            if result.stderr:
-                # Spark often logs informational messages to stderr, so we log it as a warning.
-                logger.warning(f"Spark Job STDERR for rule {rule_id}:\n{result.stderr}")
-
-            if result.returncode == 0:
+            if success:
                 logger.info(f"Spark job for rule {rule_id} finished successfully.")
-                
-                rule = Rule.query.get(rule_id)
-                if rule:
-                    rule.last_run_at = datetime.utcnow()
-                    db.session.commit()
-                    logger.info(f"Successfully executed and updated last_run_at for rule {rule_id}")
+                # Single-column bookkeeping write; a Core UPDATE skips the
+                # load-mutate-flush cycle a full ORM round-trip would pay.
+                db.session.execute(
+                    update(Rule).where(Rule.id == rule_id)
+                    .values(last_run_at=datetime.utcnow()))
+                db.session.commit()
+                logger.info(f"Successfully executed and updated last_run_at for rule {rule_id}")
                 return True
             else:
-                logger.error(f"Spark job for rule {rule_id} failed with code {result.returncode}")
+                logger.error(f"Spark job for rule {rule_id} failed")
                 return False
 
         except Exception as e:
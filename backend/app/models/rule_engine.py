@@ -17,7 +17,12 @@ class Rule(db.Model):
     last_run_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
-    
+
+    __table_args__ = (
+        # Covers the scheduler's "active rules due to run" wake-up query
+        db.Index('ix_rule_active_next', 'is_active', 'next_run_at'),
+    )
+
     # Relationships
     segment = db.relationship('SegmentCatalog', backref='rule', uselist=False, lazy=True)
     
@@ -31,10 +36,12 @@ class Rule(db.Model):
             'operation': self.operation,
             'is_active': self.is_active,
             'schedule': self.schedule,
-            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
-            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            # Datetimes pass through raw; the orjson provider serializes
+            # them to the same ISO-8601 text without per-row isoformat calls.
+            'next_run_at': self.next_run_at,
+            'last_run_at': self.last_run_at,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
     
     def save(self):
@@ -51,11 +58,13 @@ class SegmentCatalog(db.Model):
     description = db.Column(db.Text)
     table_name = db.Column(db.String(255), nullable=False)  # segment_output_<id>
     row_count = db.Column(db.Integer, default=0)
-    rule_id = db.Column(db.Integer, db.ForeignKey('rule_table.id'))
+    rule_id = db.Column(db.Integer, db.ForeignKey('rule_table.id'), index=True)
     sql_query = db.Column(db.Text, nullable=True)  # Store the generated SQL for the Spark job
     
     # Columns for lineage and reuse
-    depends_on = db.Column(db.Text, nullable=True)  # JSON array of rule_ids
+    # none_as_null stores an assigned Python None as SQL NULL, not the
+    # JSON text 'null', so raw-SQL readers see one kind of missing value.
+    depends_on = db.Column(db.JSON(none_as_null=True), nullable=True)  # list of parent rule_ids
     operation = db.Column(db.String(50), nullable=True) # e.g., INTERSECTION, UNION
 
     # Existing columns
@@ -63,7 +72,7 @@ class SegmentCatalog(db.Model):
     last_refreshed_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     
-    def to_dict(self):
+    def to_dict(self, parent_name_map=None):
         data = {
             'id': self.id,
             'segment_name': self.segment_name,
@@ -73,21 +82,30 @@ class SegmentCatalog(db.Model):
             'rule_id': self.rule_id,
             'sql_query': self.sql_query,
             'refresh_frequency': self.refresh_frequency,
-            'last_refreshed_at': self.last_refreshed_at.isoformat() if self.last_refreshed_at else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_refreshed_at': self.last_refreshed_at,
+            'created_at': self.created_at,
             'operation': self.operation,
             'dependencies': []
         }
 
-        if self.depends_on:
-            import json
-            try:
-                parent_rule_ids = json.loads(self.depends_on)
-                if parent_rule_ids:
-                    parent_segments = db.session.query(SegmentCatalog.segment_name).filter(SegmentCatalog.rule_id.in_(parent_rule_ids)).all()
-                    data['dependencies'] = [name for name, in parent_segments]
-            except (json.JSONDecodeError, TypeError):
-                data['dependencies'] = []
+        # Root segments (no dependencies) are the common case in listings;
+        # bail out before any lookup work. The JSON column parses legacy
+        # '[]' text to an empty list, so the falsy check covers it too.
+        parent_rule_ids = self.depends_on
+        if not parent_rule_ids:
+            return data
+
+        if parent_name_map is not None:
+            # Callers serializing many segments (list_segments) prefetch
+            # every parent name in one query and pass the resolved map,
+            # avoiding a SELECT per serialized row.
+            data['dependencies'] = [
+                parent_name_map[rid] for rid in parent_rule_ids
+                if rid in parent_name_map
+            ]
+        else:
+            parent_segments = db.session.query(SegmentCatalog.segment_name).filter(SegmentCatalog.rule_id.in_(parent_rule_ids)).all()
+            data['dependencies'] = [name for name, in parent_segments]
         return data
     
     def save(self):
@@ -1,6 +1,22 @@
 # app/models/transactions.py
+from sqlalchemy.inspection import inspect
+
 from .. import db
 
+def _compile_to_dict(cls):
+    """Generates an unrolled to_dict for a mapped class.
+
+    The emitted source is a single dict literal — no comprehension loop,
+    no per-key dispatch. Each field reads straight from __dict__ (skipping
+    the instrumented descriptor) and only falls back to attribute access
+    for expired/unloaded state.
+    """
+    cols = tuple(c.key for c in inspect(cls).mapper.column_attrs)
+    body = ", ".join(f"{k!r}: s[{k!r}] if {k!r} in s else self.{k}" for k in cols)
+    namespace = {}
+    exec(f"def to_dict(self):\n    s = self.__dict__\n    return {{{body}}}", namespace)
+    return namespace["to_dict"]
+
 class UPITransaction(db.Model):
     __tablename__ = 'upi_transactions_raw'
     
@@ -14,19 +30,6 @@ class UPITransaction(db.Model):
     city_tier = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'transaction_id': self.transaction_id,
-            'user_id': self.user_id,
-            'amount': self.amount,
-            'transaction_date': self.transaction_date.isoformat(),
-            'merchant_name': self.merchant_name,
-            'category': self.category,
-            'city_tier': self.city_tier,
-            'created_at': self.created_at.isoformat()
-        }
-
 class CreditCardPayment(db.Model):
     __tablename__ = 'credit_card_transactions_raw'
     
@@ -40,15 +43,7 @@ class CreditCardPayment(db.Model):
     city_tier = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'transaction_id': self.transaction_id,
-            'user_id': self.user_id,
-            'amount': self.amount,
-            'transaction_date': self.transaction_date.isoformat(),
-            'merchant_name': self.merchant_name,
-            'category': self.category,
-            'city_tier': self.city_tier,
-            'created_at': self.created_at.isoformat()
-        }
\ No newline at end of file
+# Specialized after both classes exist so the mappers are configured;
+# each class gets its own compiled function bound as a plain method.
+UPITransaction.to_dict = _compile_to_dict(UPITransaction)
+CreditCardPayment.to_dict = _compile_to_dict(CreditCardPayment)
@@ -1,11 +1,35 @@
 # app/processor/base_processor.py
+import logging
+import time
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
+
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-import logging
 
 logger = logging.getLogger(__name__)
 
+# Process-wide metadata cache. Compound rules construct one processor per
+# parent, so without this each build pays a segment_catalog round-trip for
+# rows that rarely change between runs.
+_METADATA_TTL = 60
+_metadata_cache: Dict[int, tuple] = {}
+
+# Statements built once at import; re-creating text() per call makes
+# SQLAlchemy re-parse and re-key the compiled form every time.
+_LOAD_META = text("""
+    SELECT * FROM segment_catalog
+    WHERE rule_id = :rule_id
+""")
+_UPDATE_META = text("""
+    UPDATE segment_catalog
+    SET row_count = :row_count,
+        table_name = :table_name,
+        sql_query = :sql_query,
+        last_refreshed_at = CURRENT_TIMESTAMP
+    WHERE rule_id = :rule_id
+""")
+
 class BaseSegmentProcessor(ABC):
     def __init__(self, db_session: Session, rule_id: int):
         self.db = db_session
@@ -14,11 +38,15 @@ class BaseSegmentProcessor(ABC):
         
     def _load_segment_metadata(self) -> Dict[str, Any]:
         """Load metadata for the segment from the database"""
-        result = self.db.execute("""
-            SELECT * FROM segment_catalog 
-            WHERE rule_id = :rule_id
-        """, {'rule_id': self.rule_id}).fetchone()
-        return dict(result) if result else None
+        now = time.monotonic()
+        cached = _metadata_cache.get(self.rule_id)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        result = self.db.execute(_LOAD_META, {'rule_id': self.rule_id}).fetchone()
+        metadata = dict(result._mapping) if result else None
+        _metadata_cache[self.rule_id] = (now + _METADATA_TTL, metadata)
+        return metadata
         
     @abstractmethod
     def process(self) -> bool:
@@ -28,20 +56,14 @@ class BaseSegmentProcessor(ABC):
     def update_metadata(self, row_count: int, table_name: str, sql_query: str) -> None:
         """Update segment metadata in the database"""
         try:
-            self.db.execute("""
-                UPDATE segment_catalog 
-                SET row_count = :row_count,
-                    table_name = :table_name,
-                    sql_query = :sql_query,
-                    last_refreshed_at = CURRENT_TIMESTAMP
-                WHERE rule_id = :rule_id
-            """, {
+            self.db.execute(_UPDATE_META, {
                 'row_count': row_count,
                 'table_name': table_name,
                 'sql_query': sql_query,
                 'rule_id': self.rule_id
             })
             self.db.commit()
+            _metadata_cache.pop(self.rule_id, None)
             logger.info(f"Updated metadata for segment from rule {self.rule_id}")
         except Exception as e:
             self.db.rollback()
@@ -7,7 +7,20 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Fixed shape of every segment_output_* table; pinning it as customSchema
+# spares the driver a PRAGMA table_info probe per read and keeps SQLite
+# JDBC from inferring DECIMAL columns as DOUBLE.
+_SEGMENT_COL_TYPES = {
+    "user_id": "LONG",
+    "total_transactions": "DECIMAL(20,2)",
+    "total_spent": "DECIMAL(20,2)",
+    "transaction_types": "STRING",
+}
+
 class DataSourceManager:
+    # Aggregate-table schemas discovered once, reused on later reads.
+    _AGG_SCHEMAS: Dict[str, str] = {}
+
     def __init__(self, spark_session, db_session: Session):
         self.spark = spark_session
         self.db = db_session
@@ -17,17 +30,43 @@ class DataSourceManager:
         db_path = os.path.join(backend_dir, 'db', 'audience_manager.db')
         self.jdbc_url = f"jdbc:sqlite:{db_path}"
         logger.info(f"DataSourceManager initialized with JDBC URL: {self.jdbc_url}")
-        
-    def get_segment_data(self, segment_id: int) -> Optional[Any]:
-        """Get data from an existing segment output table"""
+
+    def _reader(self, schema: str = None):
+        """Base JDBC reader with the shared connection options applied.
+
+        A pinned customSchema skips the driver's per-read schema probe; the
+        large fetchsize cuts cursor round-trips on big tables.
+        """
+        r = self.spark.read \
+            .format("jdbc") \
+            .option("driver", "org.sqlite.JDBC") \
+            .option("url", self.jdbc_url) \
+            .option("pushDownPredicate", "true") \
+            .option("sessionInitStatement", "PRAGMA cache_size=-200000;") \
+            .option("fetchsize", 10000)
+        return r.option("customSchema", schema) if schema else r
+
+    def get_segment_data(self, segment_id: int,
+                         columns: tuple = ("user_id", "total_transactions",
+                                           "total_spent", "transaction_types")) -> Optional[Any]:
+        """Get data from an existing segment output table.
+
+        Callers needing fewer columns pass them explicitly; the projection
+        runs server-side so unused columns never cross the JDBC wire.
+        """
         try:
             table_name = f"segment_output_{segment_id}"
-            return self.spark.read \
-                .format("jdbc") \
-                .option("driver", "org.sqlite.JDBC") \
-                .option("url", self.jdbc_url) \
-                .option("dbtable", table_name) \
-                .load()
+            # 'query' instead of 'dbtable' keeps Spark from wrapping the
+            # table in another subquery; the explicit column list and the
+            # null filter run inside SQLite, pruning before JDBC transfer.
+            sql = (
+                f"SELECT {', '.join(columns)} "
+                f"FROM {table_name} WHERE user_id IS NOT NULL"
+            )
+            schema = ", ".join(
+                f"{c} {_SEGMENT_COL_TYPES[c]}" for c in columns
+                if c in _SEGMENT_COL_TYPES)
+            return self._reader(schema or None).option("query", sql).load()
         except Exception as e:
             logger.warning(f"Failed to load segment {segment_id}: {str(e)}")
             return None
@@ -35,24 +74,45 @@ class DataSourceManager:
     def get_aggregate_data(self, aggregate_name: str) -> Optional[Any]:
         """Get data from aggregate tables"""
         try:
-            return self.spark.read \
-                .format("jdbc") \
-                .option("url", "jdbc:sqlite:db/audience_manager.db") \
+            # First read of a table pays the schema probe once; the DDL
+            # string is kept so later reads pin it via customSchema.
+            df = self._reader(self._AGG_SCHEMAS.get(aggregate_name)) \
                 .option("dbtable", aggregate_name) \
                 .load()
+            if aggregate_name not in self._AGG_SCHEMAS:
+                self._AGG_SCHEMAS[aggregate_name] = ", ".join(
+                    f"{f.name} {f.dataType.simpleString()}" for f in df.schema.fields)
+            return df
         except Exception as e:
             logger.warning(f"Failed to load aggregate {aggregate_name}: {str(e)}")
             return None
             
-    def get_raw_data(self, table_name: str, columns: List[str] = None) -> Any:
-        """Get data from raw tables"""
+    def get_raw_data(self, table_name: str, columns: List[str] = None,
+                     partition_column: str = None, num_partitions: int = 8) -> Any:
+        """Get data from raw tables.
+
+        When partition_column is given (typically the integer primary key),
+        the read is split into num_partitions parallel JDBC range scans
+        instead of one executor pulling the whole table. Worthwhile on
+        large raw tables; the database runs journal_mode=WAL, so concurrent
+        readers don't block each other.
+        """
         columns_str = ", ".join(columns) if columns else "*"
         # Spark's JDBC 'dbtable' option can take a subquery in parentheses
         query = f"(SELECT {columns_str} FROM {table_name}) AS {table_name}_query"
         logger.info(f"Executing raw data query: {query}")
-        return self.spark.read \
-            .format("jdbc") \
-            .option("driver", "org.sqlite.JDBC") \
-            .option("url", self.jdbc_url) \
-            .option("dbtable", query) \
-            .load()
\ No newline at end of file
+        reader = self._reader().option("dbtable", query)
+
+        if partition_column:
+            bounds = self.db.execute(text(
+                f"SELECT MIN({partition_column}), MAX({partition_column}) FROM {table_name}"
+            )).fetchone()
+            lower, upper = bounds or (None, None)
+            if lower is not None and upper is not None and upper > lower:
+                reader = reader \
+                    .option("partitionColumn", partition_column) \
+                    .option("lowerBound", int(lower)) \
+                    .option("upperBound", int(upper)) \
+                    .option("numPartitions", num_partitions)
+
+        return reader.load()
\ No newline at end of file
@@ -1,5 +1,8 @@
 # app/processor/segment_operations.py
+import sys
+from functools import reduce
 from pyspark.sql import DataFrame
+from pyspark.sql.functions import broadcast
 from typing import List, Optional
 import logging
 
@@ -10,6 +13,27 @@ class SegmentOperations:
         """Initialize with a Spark session."""
         self.spark = spark
 
+    @staticmethod
+    def _plan_size(df: DataFrame) -> int:
+        """Catalyst's sizeInBytes estimate from the optimized plan.
+
+        Read straight off the JVM plan, so no action is triggered; treats
+        a frame as huge when the internals aren't reachable.
+        """
+        try:
+            return df._jdf.queryExecution().optimizedPlan().stats().sizeInBytes().toLong()
+        except Exception:
+            return sys.maxsize
+
+    def _filter_join(self, left: DataFrame, right: DataFrame, how: str) -> DataFrame:
+        # Semi/anti joins only need the filter side's keys. When Catalyst
+        # estimates that side as no larger than the streamed side, hint a
+        # broadcast so the join skips the shuffle entirely.
+        keys = right.select("user_id")
+        if self._plan_size(right) <= self._plan_size(left):
+            keys = broadcast(keys)
+        return left.join(keys, "user_id", how)
+
     def combine_segments(self, segments: List[DataFrame], operation: str = 'UNION') -> Optional[DataFrame]:
         """Combine multiple segments using the specified operation.
         
@@ -27,28 +51,32 @@ class SegmentOperations:
             return segments[0]
             
         try:
+            # Segment outputs are keyed by user_id, so set semantics only
+            # need that column: semi/anti joins replace intersect/subtract
+            # (sort-based dedup over every column) with hash probes, and
+            # small sides stay eligible for broadcast.
             operation = operation.upper()
             if operation == 'UNION':
-                # Remove duplicates across all segments
-                return segments[0].unionAll(segments[1:]).dropDuplicates()
-                
+                return reduce(DataFrame.unionByName, segments).dropDuplicates(["user_id"])
+
             elif operation == 'INTERSECTION':
-                # Start with first segment and keep intersecting rows
-                result = segments[0]
-                for df in segments[1:]:
-                    result = result.intersect(df)
-                return result
-                
+                # Commutative, so stream the largest estimated segment and
+                # let the smaller ones become broadcast filter sides.
+                ordered = sorted(segments, key=self._plan_size, reverse=True)
+                return reduce(
+                    lambda a, b: self._filter_join(a, b, "left_semi"),
+                    ordered)
+
             elif operation == 'DIFFERENCE':
-                # Start with first segment and remove rows from others
-                result = segments[0]
-                for df in segments[1:]:
-                    result = result.subtract(df)
-                return result
-                
+                # Order matters (first minus the rest); only the filter
+                # sides may broadcast.
+                return reduce(
+                    lambda a, b: self._filter_join(a, b, "left_anti"),
+                    segments)
+
             else:
                 raise ValueError(f"Unsupported operation: {operation}")
-                
+
         except Exception as e:
             logger.error(f"Error combining segments: {str(e)}")
             raise
\ No newline at end of file
@@ -1,13 +1,17 @@
 # app/processor/spark_processor.py
 import os
 import sys
-import json
+import sqlite3
 import logging
+from decimal import Decimal
 from typing import Optional
 from datetime import datetime
 from pyspark.sql import SparkSession, DataFrame
-from pyspark.sql.functions import col
-from sqlalchemy import create_engine, text
+from pyspark.sql.types import StructType, StructField, LongType, DecimalType, StringType
+from pyspark import StorageLevel
+from dataclasses import dataclass
+from functools import lru_cache
+from sqlalchemy import create_engine, select, text
 from sqlalchemy.orm import sessionmaker
 from .base_processor import BaseSegmentProcessor
 from .segment_operations import SegmentOperations
@@ -22,43 +26,142 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_DB_PATH = os.path.join(_BACKEND_DIR, 'db', 'audience_manager.db')
+
+# One engine for the whole process: per-job create_engine/dispose cycles
+# reopened the DB file and threw away the connection cache on every run.
+# check_same_thread=False because jobs execute on scheduler worker threads.
+_ENGINE = create_engine(
+    f"sqlite:///{_DB_PATH}",
+    pool_pre_ping=True,
+    connect_args={"check_same_thread": False},
+)
+
+@lru_cache(maxsize=1)
+def _spark() -> SparkSession:
+    """Process-wide SparkSession, built on first use.
+
+    Stopping and relaunching the JVM per rule cost seconds of boot and
+    classpath resolution; every processor in this process shares this
+    session, and only process exit stops it.
+    """
+    jdbc_path = os.path.join(_BACKEND_DIR, "jars", "sqlite-jdbc-3.45.3.0.jar")
+    logger.info(f"Starting shared Spark session; JDBC JAR at: {jdbc_path}")
+    return SparkSession.builder \
+        .appName("SegmentProcessor") \
+        .master("local[*]") \
+        .config("spark.driver.extraClassPath", jdbc_path) \
+        .config("spark.executor.extraClassPath", jdbc_path) \
+        .config("spark.sql.catalogImplementation", "in-memory") \
+        .config("spark.sql.debug.maxToStringFields", "100") \
+        .getOrCreate()
+
+
+# Built once so SQLAlchemy's statement cache hits on every rule run
+# instead of re-parsing the text per call.
+_UPDATE_META = text("""
+    UPDATE segment_catalog
+    SET row_count = :row_count, last_refreshed_at = :now
+    WHERE rule_id = :rule_id
+""")
+
+# Base rules below this many output rows run as CREATE TABLE AS inside
+# SQLite; only larger segments justify the Spark JDBC round-trip.
+_SQLITE_ROW_THRESHOLD = 1_000_000
+
+# SQL set operators per catalog operation. SQLite's UNION / INTERSECT /
+# EXCEPT carry the same dedup semantics as the Spark-side combine they
+# replace on the reuse path.
+_SET_OPS = {
+    'UNION': ' UNION ',
+    'INTERSECTION': ' INTERSECT ',
+    'DIFFERENCE': ' EXCEPT ',
+}
+
+# Output schema for segment tables; also used to build the shared empty
+# DataFrame for rules that produce no rows.
+_OUTPUT_SCHEMA = StructType([
+    StructField("user_id", LongType(), True),
+    StructField("total_transactions", DecimalType(20, 2), True),
+    StructField("total_spent", DecimalType(20, 2), True),
+    StructField("transaction_types", StringType(), True)
+])
+
+@dataclass(frozen=True, slots=True)
+class SegmentMeta:
+    """The slice of SegmentCatalog the processor actually reads.
+
+    A plain frozen holder instead of the ORM object: no attribute
+    instrumentation, no identity-map entry, no lazy loaders.
+    """
+    depends_on: Optional[list]
+    operation: Optional[str]
+    sql_query: Optional[str]
+    table_name: Optional[str]
+
+
 class SparkSegmentProcessor(BaseSegmentProcessor):
+    # Cached empty output frame; see _empty_df.
+    _EMPTY = None
+
     def __init__(self, db_session, rule_id: int, spark_session: SparkSession = None):
         super().__init__(db_session, rule_id)
-        self.spark = spark_session or self._create_spark_session()
+        # Default to the shared module session; processors never stop it.
+        self.spark = spark_session or _spark()
         self.segment_ops = SegmentOperations(self.spark)
         
-        backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-        db_path = os.path.join(backend_dir, "db", "audience_manager.db")
-        self.jdbc_url = f"jdbc:sqlite:{db_path}"
-        logger.info(f"Using database at: {db_path}")
+        self.jdbc_url = f"jdbc:sqlite:{_DB_PATH}"
+        logger.info(f"Using database at: {_DB_PATH}")
+
+        # Arrow-backed toPandas: columnar transfer instead of per-row
+        # pickling when collecting output frames on the driver.
+        self.spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
 
         # Load the full segment metadata object upon initialization
         self.segment = self._get_segment_metadata_obj()
 
-    def _get_segment_metadata_obj(self) -> Optional[SegmentCatalog]:
-        """Fetches the full SegmentCatalog SQLAlchemy object for the current rule_id."""
+    def _get_segment_metadata_obj(self) -> Optional[SegmentMeta]:
+        """Fetches the catalog columns the processor needs for the current rule_id."""
         try:
-            segment = self.db.query(SegmentCatalog).filter_by(rule_id=self.rule_id).one_or_none()
-            if not segment:
+            row = self.db.execute(
+                select(SegmentCatalog.depends_on, SegmentCatalog.operation,
+                       SegmentCatalog.sql_query, SegmentCatalog.table_name)
+                .where(SegmentCatalog.rule_id == self.rule_id)
+            ).one_or_none()
+            if not row:
                 logger.error(f"No SegmentCatalog entry found for rule_id: {self.rule_id}")
                 return None
-            return segment
+            return SegmentMeta(*row)
         except Exception as e:
             logger.error(f"Error fetching SegmentCatalog for rule {self.rule_id}: {e}", exc_info=True)
             return None
 
-    def _create_spark_session(self) -> SparkSession:
-        backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-        jdbc_path = os.path.join(backend_dir, "jars", "sqlite-jdbc-3.45.3.0.jar")
-        logger.info(f"Using JDBC JAR at: {jdbc_path}")
-        
-        return SparkSession.builder \
-            .appName(f"SegmentProcessor-Rule-{self.rule_id}") \
-            .config("spark.driver.extraClassPath", jdbc_path) \
-            .config("spark.executor.extraClassPath", jdbc_path) \
-            .config("spark.sql.debug.maxToStringFields", "100") \
-            .getOrCreate()
+    @classmethod
+    def _empty_df(cls, spark: SparkSession) -> DataFrame:
+        """Returns the shared empty output DataFrame.
+
+        Built once per session instead of paying emptyRDD/createDataFrame
+        schema conversion on every empty segment.
+        """
+        if cls._EMPTY is None or cls._EMPTY.sparkSession is not spark:
+            cls._EMPTY = spark.createDataFrame([], _OUTPUT_SCHEMA)
+        return cls._EMPTY
+
+    def _jdbc_reader(self, schema: str):
+        """JDBC reader with the shared connection profile applied.
+
+        Every read opens a fresh JDBC connection, so the per-connection
+        init statement gives each one a useful page cache, and the large
+        fetchsize keeps cursor round-trips down.
+        """
+        return self.spark.read \
+            .format("jdbc") \
+            .option("driver", "org.sqlite.JDBC") \
+            .option("url", self.jdbc_url) \
+            .option("fetchsize", 10000) \
+            .option("sessionInitStatement", "PRAGMA cache_size=-200000;") \
+            .option("customSchema", schema)
 
     def _get_segment_data(self) -> Optional[DataFrame]:
         """Determines the data retrieval strategy based on segment dependencies."""
@@ -73,27 +176,33 @@ class SparkSegmentProcessor(BaseSegmentProcessor):
             logger.info(f"[REUSE] Compound rule detected for rule {self.rule_id}. Reusing existing segments.")
             logger.info(f"[REUSE] Operation: {self.segment.operation}, Depends On: {self.segment.depends_on}")
 
-            try:
-                parent_rule_ids = json.loads(self.segment.depends_on)
-            except (json.JSONDecodeError, TypeError):
-                logger.error(f"[REUSE] Could not parse 'depends_on' field: {self.segment.depends_on}")
+            # depends_on is a JSON column; the ORM hands back a parsed list.
+            parent_rule_ids = self.segment.depends_on
+            if not isinstance(parent_rule_ids, list):
+                logger.error(f"[REUSE] Unexpected 'depends_on' value: {self.segment.depends_on}")
                 return None
 
-            parent_segment_dfs = []
-            for parent_id in parent_rule_ids:
-                df = self._get_segment_data_from_output(parent_id)
-                if df:
-                    logger.info(f"[REUSE] Successfully loaded parent segment from rule {parent_id}.")
-                    parent_segment_dfs.append(df)
-                else:
-                    logger.error(f"[REUSE] Failed to load parent segment from rule {parent_id}. Aborting.")
-                    return None
-
-            if len(parent_segment_dfs) < 2:
-                logger.error(f"[REUSE] Not enough parent segments ({len(parent_segment_dfs)}) could be loaded for combination.")
+            set_op = _SET_OPS.get(self.segment.operation.upper())
+            if set_op is None:
+                logger.error(f"[REUSE] Unsupported operation: {self.segment.operation}")
                 return None
 
-            return self.segment_ops.combine_segments(parent_segment_dfs, self.segment.operation)
+            # Push the whole set operation down into SQLite as one JDBC
+            # query: one round-trip instead of a read per parent, and the
+            # UNION/INTERSECT/EXCEPT is evaluated by SQLite rather than a
+            # Spark shuffle over all parents.
+            combined_sql = set_op.join(
+                f"SELECT user_id, total_transactions, total_spent, transaction_types "
+                f"FROM segment_output_{parent_id}"
+                for parent_id in parent_rule_ids
+            )
+            logger.debug(f"[REUSE] Pushdown query: {combined_sql}")
+            try:
+                schema = "user_id LONG, total_transactions DECIMAL(20,2), total_spent DECIMAL(20,2), transaction_types STRING"
+                return self._jdbc_reader(schema).option("query", combined_sql).load()
+            except Exception as e:
+                logger.error(f"[REUSE] Failed to load combined parent segments: {e}", exc_info=True)
+                return None
 
         # 2. If no dependencies, process as a base rule using its SQL query
         elif self.segment.sql_query:
@@ -101,15 +210,33 @@ class SparkSegmentProcessor(BaseSegmentProcessor):
             logger.debug(f"[BASE] SQL Query: {self.segment.sql_query}")
             try:
                 schema = "user_id LONG, total_transactions LONG, total_spent DECIMAL(20,2), transaction_types STRING"
-                df = self.spark.read \
-                    .format("jdbc") \
-                    .option("url", self.jdbc_url) \
-                    .option("query", f"({self.segment.sql_query}) as subquery") \
-                    .option("driver", "org.sqlite.JDBC") \
-                    .option("customSchema", schema) \
-                    .load()
-                
-                return df.filter(col("user_id").isNotNull())
+                # Project the output columns and filter null user_ids inside
+                # the JDBC query itself: Spark can't push filters through a
+                # subquery alias, so doing it in SQL lets SQLite drop the
+                # rows before they cross the wire and removes the post-read
+                # filter stage.
+                base_sql = (
+                    "SELECT user_id, total_transactions, total_spent, transaction_types "
+                    f"FROM ({self.segment.sql_query}) WHERE user_id IS NOT NULL"
+                )
+
+                # Without partition bounds the JDBC source issues one
+                # sequential SELECT; bounded on user_id, Spark fans the read
+                # out into disjoint range scans. The MIN/MAX probe is cheap
+                # relative to re-running the aggregate query single-threaded.
+                bounds = self.db.execute(text(
+                    f"SELECT MIN(user_id), MAX(user_id) FROM ({self.segment.sql_query})"
+                )).fetchone()
+                lower, upper = bounds or (None, None)
+                if lower is not None and upper is not None and upper > lower:
+                    return self._jdbc_reader(schema) \
+                        .option("dbtable", f"({base_sql}) AS base_q") \
+                        .option("partitionColumn", "user_id") \
+                        .option("lowerBound", int(lower)) \
+                        .option("upperBound", int(upper)) \
+                        .option("numPartitions", 4) \
+                        .load()
+                return self._jdbc_reader(schema).option("query", base_sql).load()
             except Exception as e:
                 logger.error(f"[BASE] Error executing SQL query for rule {self.rule_id}: {e}", exc_info=True)
                 return None
@@ -125,116 +252,160 @@ class SparkSegmentProcessor(BaseSegmentProcessor):
             logger.info(f"Loading data from dependent table: {table_name}")
             # Use a query with an explicit schema to avoid type inference issues with SQLite JDBC
             schema = "user_id LONG, total_transactions DECIMAL(20,2), total_spent DECIMAL(20,2), transaction_types STRING"
-            return self.spark.read \
-                .format("jdbc") \
-                .option("url", self.jdbc_url) \
-                .option("query", f"(SELECT * FROM {table_name}) as subquery") \
-                .option("driver", "org.sqlite.JDBC") \
-                .option("customSchema", schema) \
-                .load()
+            # Explicit column list + SQL-side null filter: SQLite prunes
+            # columns and rows before JDBC transfer.
+            sql = (
+                "SELECT user_id, total_transactions, total_spent, transaction_types "
+                f"FROM {table_name} WHERE user_id IS NOT NULL"
+            )
+            return self._jdbc_reader(schema).option("query", sql).load()
         except Exception as e:
             logger.warning(f"Failed to load segment for rule {rule_id}: {e}")
             return None
     
     def _update_segment_metadata(self, row_count: int) -> None:
-        engine = None
-        db_session = None
         try:
-            backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            db_path = os.path.join(backend_dir, 'db', 'audience_manager.db')
-            db_url = f"sqlite:///{db_path}"
-            engine = create_engine(db_url)
-            Session = sessionmaker(bind=engine)
-            db_session = Session()
-            
             logger.info(f"Updating metadata for rule {self.rule_id} with row_count {row_count}")
-            
-            db_session.execute(
-                text("""
-                    UPDATE segment_catalog 
-                    SET row_count = :row_count, last_refreshed_at = :now
-                    WHERE rule_id = :rule_id
-                """),
+
+            # The injected session already holds a connection to the same
+            # database; no need to spin up a throwaway engine per job.
+            self.db.execute(
+                _UPDATE_META,
                 {'row_count': row_count, 'now': datetime.utcnow(), 'rule_id': self.rule_id}
             )
-            db_session.commit()
+            self.db.commit()
             logger.info(f"Successfully updated metadata for rule {self.rule_id}")
         except Exception as e:
             logger.error(f"Failed to update segment metadata for rule {self.rule_id}: {e}", exc_info=True)
-            if db_session: db_session.rollback()
-        finally:
-            if db_session: db_session.close()
-            if engine: engine.dispose()
+            self.db.rollback()
+
+    def _save_segment_output(self, df: DataFrame) -> Optional[int]:
+        """Writes the frame to segment_output_<rule_id>.
 
-    def _save_segment_output(self, df: DataFrame) -> bool:
+        Returns the number of rows written (the catalog's row_count), or
+        None on failure — the collected batch is already on the driver, so
+        counting it is free and spares process() a separate Spark count().
+        """
         output_table = f"segment_output_{self.rule_id}"
-        engine = None
         try:
-            backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            db_path = os.path.join(backend_dir, 'db', 'audience_manager.db')
-            db_url = f"sqlite:///{db_path}"
-            engine = create_engine(db_url)
-            
-            logger.info(f"Dropping existing table `{output_table}` if it exists...")
-            with engine.connect() as connection:
-                with connection.begin():
-                    connection.execute(text(f"DROP TABLE IF EXISTS {output_table}"))
-            logger.info(f"Successfully dropped table `{output_table}`.")
+            # Driver-side save: output tables are small (one row per user),
+            # so collect through Arrow and bulk-insert with sqlite3. One
+            # executemany in one transaction skips the JDBC write path's
+            # per-row PreparedStatement marshaling entirely.
+            pdf = df.toPandas()
+            rows = [
+                tuple(float(v) if isinstance(v, Decimal) else v for v in row)
+                for row in pdf.itertuples(index=False, name=None)
+            ]
+            # Autocommit off the table: transactions are controlled
+            # explicitly below so the implicit-BEGIN machinery can't
+            # collide with BEGIN IMMEDIATE.
+            conn = sqlite3.connect(_DB_PATH, isolation_level=None)
+            try:
+                # Write-throughput PRAGMAs: no fsync barriers, in-memory
+                # temp space, larger page cache. Safe here because
+                # segment_output_* tables are recomputable caches — never
+                # apply this to segment_catalog or the raw tables.
+                conn.executescript(
+                    "PRAGMA journal_mode=WAL;"
+                    "PRAGMA synchronous=OFF;"
+                    "PRAGMA temp_store=MEMORY;"
+                    "PRAGMA cache_size=-200000;"
+                )
+                # Drop, create and fill inside one transaction: readers
+                # never observe a missing or half-written table, and the
+                # old separate DDL round-trip through SQLAlchemy is gone.
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(f"DROP TABLE IF EXISTS {output_table}")
+                conn.execute(f"""
+                    CREATE TABLE {output_table} (
+                        user_id BIGINT,
+                        total_transactions DECIMAL(20,2),
+                        total_spent DECIMAL(20,2),
+                        transaction_types TEXT
+                    )
+                """)
+                insert_sql = f"INSERT INTO {output_table} VALUES (?, ?, ?, ?)"
+                for start in range(0, len(rows), 10_000):
+                    conn.executemany(insert_sql, rows[start:start + 10_000])
+                conn.commit()
+            finally:
+                conn.close()
+            return len(rows)
         except Exception as e:
-            logger.error(f"Could not drop table `{output_table}`: {e}", exc_info=True)
-            return False
-        finally:
-            if engine: engine.dispose()
+            logger.error(f"Failed to save segment output to {output_table}: {e}", exc_info=True)
+            return None
 
+    def _process_in_sqlite(self) -> Optional[bool]:
+        """Runs a small base rule entirely inside SQLite.
+
+        The generated query is plain SQL over raw tables, so below the
+        size threshold a CREATE TABLE AS in SQLite beats shipping rows
+        through Spark and back. Returns True on success, None when the
+        rule should take the Spark path instead.
+        """
+        if not self.segment or not self.segment.sql_query or self.segment.depends_on:
+            return None
+        output_table = f"segment_output_{self.rule_id}"
+        select_sql = (
+            "SELECT user_id, total_transactions, total_spent, transaction_types "
+            f"FROM ({self.segment.sql_query}) WHERE user_id IS NOT NULL"
+        )
         try:
-            # Define column types for the target table to ensure schema consistency
-            column_types = "user_id BIGINT, total_transactions DECIMAL(20,2), total_spent DECIMAL(20,2), transaction_types STRING"
-            df.write \
-                .format("jdbc") \
-                .option("url", self.jdbc_url) \
-                .option("dbtable", output_table) \
-                .option("driver", "org.sqlite.JDBC") \
-                .option("createTableColumnTypes", column_types) \
-                .mode("overwrite") \
-                .save()
+            row_count = self.db.execute(
+                text(f"SELECT COUNT(*) FROM ({select_sql})")).scalar()
+            if row_count is None or row_count >= _SQLITE_ROW_THRESHOLD:
+                return None
+            with _ENGINE.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {output_table}"))
+                conn.execute(text(f"CREATE TABLE {output_table} AS {select_sql}"))
+            self._update_segment_metadata(row_count)
+            logger.info(
+                f"Processed rule {self.rule_id} in SQLite ({row_count} rows), Spark skipped.")
             return True
         except Exception as e:
-            logger.error(f"Failed to save segment output to {output_table}: {e}", exc_info=True)
-            return False
+            logger.warning(
+                f"SQLite fast path failed for rule {self.rule_id}; falling back to Spark: {e}")
+            return None
 
     def process(self) -> bool:
         try:
             logger.info(f"Processing segment for rule {self.rule_id}")
+
+            fast = self._process_in_sqlite()
+            if fast is not None:
+                return fast
+
             df = self._get_segment_data()
-            
-            row_count = 0
-            if df is None or df.rdd.isEmpty():
+
+            # Persist before probing: the emptiness check and the save
+            # reuse the cached partitions instead of re-running the JDBC
+            # read per action.
+            if df is not None:
+                df = df.persist(StorageLevel.MEMORY_AND_DISK)
+
+            # Native isEmpty (Spark 3.3+) short-circuits with a LIMIT 1 plan
+            # instead of round-tripping rows through Py4J.
+            if df is None or df.isEmpty():
                 logger.warning(f"No data found for rule {self.rule_id}. Creating an empty segment output.")
-                from pyspark.sql.types import StructType, StructField, LongType, DecimalType, StringType
-                schema = StructType([
-                    StructField("user_id", LongType(), True),
-                    StructField("total_transactions", DecimalType(20, 2), True),
-                    StructField("total_spent", DecimalType(20, 2), True),
-                    StructField("transaction_types", StringType(), True)
-                ])
-                df = self.spark.createDataFrame(self.spark.sparkContext.emptyRDD(), schema)
-                row_count = 0
-            else:
-                row_count = df.count()
-                
-            if not self._save_segment_output(df):
+                if df is not None:
+                    df.unpersist()
+                df = self._empty_df(self.spark)
+
+            # The save reports how many rows it wrote, so no separate
+            # df.count() scan is needed for the catalog.
+            row_count = self._save_segment_output(df)
+            if row_count is None:
                 logger.error(f"Failed to save output for rule {self.rule_id}")
                 return False
-                
+
+            df.unpersist()
             self._update_segment_metadata(row_count)
             logger.info(f"Successfully processed segment for rule {self.rule_id} with {row_count} rows")
             return True
         except Exception as e:
             logger.error(f"Error processing segment for rule {self.rule_id}: {e}", exc_info=True)
             return False
-        finally:
-            if hasattr(self, 'spark') and self.spark.getActiveSession():
-                self.spark.stop()
 
 if __name__ == "__main__":
     import argparse
@@ -244,11 +415,7 @@ if __name__ == "__main__":
         parser.add_argument('--rule_id', type=int, required=True, help='ID of the rule to process')
         args = parser.parse_args()
         
-        backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        db_path = os.path.join(backend_dir, 'db', 'audience_manager.db')
-        db_url = f"sqlite:///{db_path}"
-        engine = create_engine(db_url)
-        Session = sessionmaker(bind=engine)
+        Session = sessionmaker(bind=_ENGINE)
         db_session = Session()
         
         logger.info(f"Starting segment processor for rule_id: {args.rule_id}")
@@ -261,4 +428,6 @@ if __name__ == "__main__":
         sys.exit(1)
     finally:
         if db_session:
-            db_session.close()
\ No newline at end of file
+            db_session.close()
+        if _spark.cache_info().currsize:
+            _spark().stop()
\ No newline at end of file
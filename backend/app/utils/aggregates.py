@@ -4,65 +4,60 @@ from ..models import UPITransaction, CreditCardPayment
 
 def get_category_totals(start_date=None, end_date=None):
     """Get transaction totals grouped by category"""
-    # Base queries
-    upi_query = UPITransaction.query
-    cc_query = CreditCardPayment.query
-    
-    # Apply date filters if provided
-    if start_date:
-        if isinstance(start_date, str):
-            start_date = datetime.strptime(start_date, '%Y-%m-%d')
-        upi_query = upi_query.filter(UPITransaction.transaction_date >= start_date)
-        cc_query = cc_query.filter(CreditCardPayment.transaction_date >= start_date)
-    if end_date:
-        if isinstance(end_date, str):
-            end_date = datetime.strptime(end_date, '%Y-%m-%d')
-        upi_query = upi_query.filter(UPITransaction.transaction_date <= end_date)
-        cc_query = cc_query.filter(CreditCardPayment.transaction_date <= end_date)
-    
-    # Get UPI totals by category
-    upi_totals = upi_query.with_entities(
-        UPITransaction.category,
-        func.count(UPITransaction.id).label('count'),
-        func.sum(UPITransaction.amount).label('total_amount')
-    ).group_by(UPITransaction.category).all()
-    
-    # Get Credit Card totals by category
-    cc_totals = cc_query.with_entities(
-        CreditCardPayment.category,
-        func.count(CreditCardPayment.id).label('count'),
-        func.sum(CreditCardPayment.amount).label('total_amount')
-    ).group_by(CreditCardPayment.category).all()
-    
-    # Combine and format results
-    result = {}
-    for category, count, total in upi_totals:
-        if not category:  # Skip None categories
-            continue
-        if category not in result:
-            result[category] = {'count': 0, 'total_amount': 0, 'type': 'combined'}
-        result[category]['count'] += count or 0
-        result[category]['total_amount'] += float(total or 0)
-    
-    for category, count, total in cc_totals:
-        if not category:  # Skip None categories
-            continue
-        if category not in result:
-            result[category] = {'count': 0, 'total_amount': 0, 'type': 'combined'}
-        result[category]['count'] += count or 0
-        result[category]['total_amount'] += float(total or 0)
-    
-    return result
+    from sqlalchemy import union_all, select
+    from .. import db
+
+    if start_date and isinstance(start_date, str):
+        start_date = datetime.strptime(start_date, '%Y-%m-%d')
+    if end_date and isinstance(end_date, str):
+        end_date = datetime.strptime(end_date, '%Y-%m-%d')
+
+    # One round-trip: per-source GROUP BY subqueries merged by an outer
+    # aggregate, replacing two queries plus a Python dict merge.
+    subqueries = []
+    for model in (UPITransaction, CreditCardPayment):
+        q = select(
+            model.category,
+            func.count(model.id).label('count'),
+            func.sum(model.amount).label('total_amount')
+        )
+        if start_date:
+            q = q.where(model.transaction_date >= start_date)
+        if end_date:
+            q = q.where(model.transaction_date <= end_date)
+        subqueries.append(q.group_by(model.category))
+
+    combined = union_all(*subqueries).alias('per_source')
+    rows = db.session.execute(
+        select(
+            combined.c.category,
+            func.sum(combined.c.count),
+            func.sum(combined.c.total_amount)
+        ).where(combined.c.category.isnot(None))
+        .group_by(combined.c.category)
+    ).all()
+
+    return {
+        category: {
+            'count': int(count or 0),
+            'total_amount': float(total or 0),
+            'type': 'combined'
+        }
+        for category, count, total in rows
+    }
 
 def get_daily_totals(days=30):
     """Get daily transaction totals for the last N days"""
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
-    
-    # Format dates for SQL query
-    start_date_str = start_date.strftime('%Y-%m-%d')
-    end_date_str = end_date.strftime('%Y-%m-%d')
-    
+
+    # Bare-column range predicates: wrapping the column in date() defeats
+    # any index on transaction_date and forces a full scan. The day
+    # bucketing stays in the projection/GROUP BY, where it's harmless.
+    range_start = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    range_end = (end_date + timedelta(days=1)).replace(
+        hour=0, minute=0, second=0, microsecond=0)
+
     # Get UPI daily totals
     upi_daily = UPITransaction.query.with_entities(
         func.date(UPITransaction.transaction_date).label('date'),
@@ -70,11 +65,11 @@ def get_daily_totals(days=30):
         func.sum(UPITransaction.amount).label('total_amount')
     ).filter(
         and_(
-            func.date(UPITransaction.transaction_date) >= start_date_str,
-            func.date(UPITransaction.transaction_date) <= end_date_str
+            UPITransaction.transaction_date >= range_start,
+            UPITransaction.transaction_date < range_end
         )
     ).group_by('date').all()
-    
+
     # Get Credit Card daily totals
     cc_daily = CreditCardPayment.query.with_entities(
         func.date(CreditCardPayment.transaction_date).label('date'),
@@ -82,18 +77,18 @@ def get_daily_totals(days=30):
         func.sum(CreditCardPayment.amount).label('total_amount')
     ).filter(
         and_(
-            func.date(CreditCardPayment.transaction_date) >= start_date_str,
-            func.date(CreditCardPayment.transaction_date) <= end_date_str
+            CreditCardPayment.transaction_date >= range_start,
+            CreditCardPayment.transaction_date < range_end
         )
     ).group_by('date').all()
     
-    # Initialize result with all dates in range
-    result = {}
-    current_date = start_date
-    while current_date <= end_date:
-        date_str = current_date.strftime('%Y-%m-%d')
-        result[date_str] = {'count': 0, 'total_amount': 0}
-        current_date += timedelta(days=1)
+    # Initialize result with all dates in range; the vectorized strftime
+    # materializes every key in C instead of a datetime + format call per
+    # loop iteration.
+    import pandas as pd
+    dates = pd.date_range(start_date.date(), end_date.date(),
+                          freq='D').strftime('%Y-%m-%d')
+    result = {d: {'count': 0, 'total_amount': 0} for d in dates}
     
     # Update with actual data
     for date, count, total in upi_daily + cc_daily:
@@ -148,78 +143,89 @@ def get_users_by_transaction_filters(
     """
     from sqlalchemy import union_all, select
 
-    # Define common columns for union
+    # Pre-aggregate each source to one (user_id, count, amount) row per
+    # user before the union: only per-user summaries cross into the outer
+    # merge instead of every matching transaction row.
     upi_q = UPITransaction.query.with_entities(
         UPITransaction.user_id,
-        UPITransaction.amount,
-        UPITransaction.city_tier,
-        UPITransaction.category,
-        UPITransaction.transaction_date
-    )
+        func.count().label('transaction_count'),
+        func.sum(UPITransaction.amount).label('total_amount')
+    ).group_by(UPITransaction.user_id)
     cc_q = CreditCardPayment.query.with_entities(
         CreditCardPayment.user_id,
-        CreditCardPayment.amount,
-        CreditCardPayment.city_tier,
-        CreditCardPayment.category,
-        CreditCardPayment.transaction_date
-    )
+        func.count().label('transaction_count'),
+        func.sum(CreditCardPayment.amount).label('total_amount')
+    ).group_by(CreditCardPayment.user_id)
 
     # Apply filters based on transaction type
     if transaction_type == 'upi':
-        queries = [upi_q]
+        sources = [(upi_q, UPITransaction)]
     elif transaction_type == 'credit_card':
-        queries = [cc_q]
+        sources = [(cc_q, CreditCardPayment)]
     else:
-        queries = [upi_q, cc_q]
+        sources = [(upi_q, UPITransaction), (cc_q, CreditCardPayment)]
 
-    # Apply common filters to each query
+    # Apply common filters against each source's own columns. The old loop
+    # referenced UPITransaction columns for both sources, which dragged
+    # upi_transactions_raw into the credit-card query as a cross join.
+    # Collecting the conditions and filtering once also gives SQLAlchemy a
+    # single predicate to compile per source.
     filtered_queries = []
-    for q in queries:
+    for q, model in sources:
+        conds = []
         if min_amount is not None:
-            q = q.filter(UPITransaction.amount >= min_amount)
+            conds.append(model.amount >= min_amount)
         if city_tier is not None:
-            q = q.filter(UPITransaction.city_tier == city_tier)
+            conds.append(model.city_tier == city_tier)
         if category is not None:
-            q = q.filter(UPITransaction.category == category)
+            conds.append(model.category == category)
         if days is not None:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
-            q = q.filter(UPITransaction.transaction_date >= cutoff_date)
+            conds.append(model.transaction_date >= cutoff_date)
+        if conds:
+            q = q.filter(and_(*conds))
         filtered_queries.append(q)
 
     # Combine queries using UNION ALL
     if not filtered_queries:
         return {'total': 0, 'items': [], 'pages': 0, 'page': page}
 
-    combined_query = union_all(*[q.statement for q in filtered_queries]).alias('transactions')
+    combined_query = union_all(*[q.statement for q in filtered_queries]).alias('per_source')
 
-    # Build the final aggregation query
-    final_query = select([
+    # Sum-merge the per-source summaries; a user appearing in both sources
+    # contributes one row from each, so the outer GROUP BY sees at most
+    # two rows per user.
+    final_query = select(
         combined_query.c.user_id,
-        func.count(combined_query.c.user_id).label('transaction_count'),
-        func.sum(combined_query.c.amount).label('total_amount')
-    ]).group_by(combined_query.c.user_id).having(
-        func.count(combined_query.c.user_id) >= min_transactions
+        func.sum(combined_query.c.transaction_count).label('transaction_count'),
+        func.sum(combined_query.c.total_amount).label('total_amount')
+    ).group_by(combined_query.c.user_id).having(
+        func.sum(combined_query.c.transaction_count) >= min_transactions
     )
 
     # Get total count for pagination
-    from ..utils.database import db
-    total_count_query = select([func.count()]).select_from(final_query.alias('sub'))
+    from .. import db
+    total_count_query = select(func.count()).select_from(final_query.alias('sub'))
     total = db.session.execute(total_count_query).scalar_one_or_none() or 0
 
-    # Apply pagination
+    # Stream the page through a server-side cursor instead of materializing
+    # the whole result set; callers iterate `rows` once.
     paginated_query = final_query.limit(per_page).offset((page - 1) * per_page)
-    results = db.session.execute(paginated_query).fetchall()
+    results = db.session.execute(
+        paginated_query.execution_options(stream_results=True, yield_per=200)
+    )
 
-    # Format results
-    items = [{
-        'user_id': r.user_id,
-        'transaction_count': r.transaction_count,
-        'total_amount': round(float(r.total_amount or 0), 2)
-    } for r in results]
+    def row_iter():
+        for r in results:
+            yield {
+                'user_id': r.user_id,
+                'transaction_count': r.transaction_count,
+                'total_amount': round(float(r.total_amount or 0), 2)
+            }
 
     return {
         'total': total,
-        'items': items,
+        'rows': row_iter(),
         'pages': (total + per_page - 1) // per_page,
         'page': page
     }
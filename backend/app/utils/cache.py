@@ -0,0 +1,109 @@
+# app/utils/cache.py
+import logging
+import time
+from functools import wraps
+
+from flask import Response, current_app, request
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Cached entries are kept past their TTL for this grace window so a backend
+# error can fall back to serving the stale body instead of a 500.
+STALE_GRACE_SECONDS = 300
+
+# When Redis is unreachable, stop trying for this long so every request
+# doesn't pay a connect timeout.
+_REDIS_RETRY_SECONDS = 30
+
+_redis_client = None
+_redis_down_until = 0.0
+
+
+def _get_client():
+    """Returns the shared Redis client, or None while Redis is unreachable."""
+    global _redis_client, _redis_down_until
+    if time.monotonic() < _redis_down_until:
+        return None
+    if _redis_client is None:
+        url = current_app.config.get('REDIS_URL', 'redis://localhost:6379/0')
+        _redis_client = redis.Redis.from_url(
+            url, socket_connect_timeout=0.2, socket_timeout=0.5
+        )
+    return _redis_client
+
+
+def _mark_down():
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+    logger.warning("Redis unavailable; response cache disabled for %ss", _REDIS_RETRY_SECONDS)
+
+
+def _cache_key():
+    args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+    return f'amcache:{request.path}?{args}'
+
+
+def cache_response(ttl):
+    """Caches a GET view's JSON body in Redis for ``ttl`` seconds.
+
+    A hit skips the view (and its SQLAlchemy work) entirely and replays the
+    stored bytes. If the view raises while a stale entry is still within
+    STALE_GRACE_SECONDS, the stale body is served instead of the error. When
+    Redis is down the decorator is a no-op passthrough.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            client = _get_client()
+            key = cached = None
+            if client is not None:
+                key = _cache_key()
+                try:
+                    cached = client.hgetall(key)
+                except redis.RedisError:
+                    _mark_down()
+                    client = cached = None
+                if cached and float(cached[b'stale_at']) > time.time():
+                    return Response(cached[b'body'], status=int(cached[b'status']),
+                                    mimetype='application/json')
+
+            try:
+                rv = view(*args, **kwargs)
+            except Exception:
+                if cached:
+                    logger.warning("Serving stale cache for %s after backend error", request.path)
+                    return Response(cached[b'body'], status=int(cached[b'status']),
+                                    mimetype='application/json')
+                raise
+
+            resp = current_app.make_response(rv)
+            if client is not None and resp.status_code == 200:
+                try:
+                    now = time.time()
+                    client.hset(key, mapping={
+                        'timestamp': now,
+                        'stale_at': now + ttl,
+                        'status': resp.status_code,
+                        'body': resp.get_data(),
+                    })
+                    client.expire(key, int(ttl + STALE_GRACE_SECONDS))
+                except redis.RedisError:
+                    _mark_down()
+            return resp
+        return wrapper
+    return decorator
+
+
+def invalidate_cache(path_prefix):
+    """Drops every cached response whose path starts with ``path_prefix``."""
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        keys = list(client.scan_iter(match=f'amcache:{path_prefix}*'))
+        if keys:
+            client.delete(*keys)
+    except redis.RedisError:
+        _mark_down()
@@ -1,7 +1,8 @@
+import threading
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 from contextlib import contextmanager
-from flask import current_app
 
 class DatabaseManager:
     def __init__(self, db=None):
@@ -9,12 +10,15 @@ class DatabaseManager:
         self.db = db
         self._engine = None
         self._session_factory = None
+        self._factory_lock = threading.Lock()
         self._app = None
-    
+
     def init_app(self, app):
         """Initialize the database with the given Flask app."""
         self._app = app
-        # We'll create the engine and session factory lazily when first needed
+        # Build the factory now that the DB URI is known, so request
+        # threads never race to construct it.
+        self._ensure_factory()
         app.teardown_appcontext(self.close_session)
     
     def _get_engine(self):
@@ -35,14 +39,22 @@ class DatabaseManager:
         """Get the database engine."""
         return self._get_engine()
     
+    def _ensure_factory(self):
+        """Build the scoped-session factory once, double-checked under a lock."""
+        if self._session_factory is None:
+            with self._factory_lock:
+                if self._session_factory is None:
+                    self._session_factory = scoped_session(
+                        sessionmaker(autocommit=False, autoflush=False, bind=self._get_engine())
+                    )
+        return self._session_factory
+
     @property
     def Session(self):
         """Get the scoped session."""
-        if not hasattr(self, '_session_factory') or self._session_factory is None:
-            self._session_factory = scoped_session(
-                sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-            )
-        return self._session_factory
+        # Plain attribute read on the common path; the lazy build only
+        # runs for callers that skipped init_app.
+        return self._session_factory or self._ensure_factory()
     
     @contextmanager
     def session_scope(self):
@@ -63,8 +75,8 @@ class DatabaseManager:
     
     def close_session(self, exception=None):
         """Close the current database session."""
-        if hasattr(self, 'Session') and self.Session:
-            self.Session.remove()
+        if self._session_factory is not None:
+            self._session_factory.remove()
 
 # This will be initialized in app/__init__.py after db is created
 db_manager = DatabaseManager()
\ No newline at end of file
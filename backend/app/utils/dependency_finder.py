@@ -1,17 +1,42 @@
 # app/utils/dependency_finder.py
 import logging
 from typing import List, Dict, Any, Tuple, Optional, Set
+
+import numpy as np
+
 from ..models.rule_engine import Rule
 from .. import db
 
 logger = logging.getLogger(__name__)
 
-def _conditions_to_set(conditions: List[Dict[str, Any]]) -> Optional[Set[tuple]]:
-    """Converts a list of condition dicts to a canonical set of sorted tuples for comparison."""
+# Each rule's condition set is summarized as a 256-bit bitmap over condition
+# hash buckets. A rule can only be a subset of the incoming conditions if its
+# bitmap is covered by the query bitmap, so one vectorized AND prunes most
+# candidates before any exact set comparison. Bitmaps are cached per rule and
+# invalidated via updated_at.
+_BITMAP_BITS = 256
+_BITMAP_WORDS = _BITMAP_BITS // 64
+_rule_bitmap_cache: Dict[int, tuple] = {}
+
+
+def _condition_bitmap(conditions_set: Set[tuple]) -> np.ndarray:
+    """Packs a condition set into a fixed-size hash bitmap (uint64 words)."""
+    bitmap = np.zeros(_BITMAP_WORDS, dtype=np.uint64)
+    for cond in conditions_set:
+        bit = hash(cond) % _BITMAP_BITS
+        bitmap[bit >> 6] |= np.uint64(1 << (bit & 63))
+    return bitmap
+
+def _conditions_to_set(conditions: List[Dict[str, Any]]) -> Optional[frozenset]:
+    """Converts a list of condition dicts to a canonical frozenset of sorted tuples.
+
+    Frozensets hash once and reuse that hash across subset probes, which
+    matters because cached condition sets are compared on every search.
+    """
     if not isinstance(conditions, list):
         return None
     try:
-        return {tuple(sorted(cond.items())) for cond in conditions}
+        return frozenset(tuple(sorted(cond.items())) for cond in conditions)
     except (TypeError, AttributeError):
         logger.warning(f"Could not parse conditions, they may contain unhashable types: {conditions}")
         return None
@@ -33,30 +58,59 @@ def find_best_dependency(new_conditions: List[Dict[str, Any]], rule_id_to_exclud
     if not all_conditions_set or len(all_conditions_set) < 1:
         return None
 
-    # Fetch all active rules, sorted by the number of conditions descending.
-    # This makes our greedy algorithm more effective.
-    query = Rule.query.filter(Rule.is_active == True).order_by(db.func.json_array_length(Rule.conditions).desc())
+    # Fetch active rules sorted by the number of conditions descending,
+    # which makes our greedy algorithm more effective. The server-side
+    # json_array_length filter discards rules that can't possibly be
+    # subsets (more conditions than the new rule, or none at all) before
+    # any row crosses the wire, and the column tuple skips ORM hydration —
+    # the loop only needs id, updated_at and conditions. Streamed in
+    # chunks; the loop breaks as soon as all conditions are covered.
+    n_conditions = db.func.json_array_length(Rule.conditions)
+    query = (db.session.query(Rule.id, Rule.updated_at, Rule.conditions)
+             .filter(Rule.is_active == True,
+                     n_conditions > 0,
+                     n_conditions <= len(all_conditions_set))
+             .order_by(n_conditions.desc()))
     if rule_id_to_exclude:
         query = query.filter(Rule.id != rule_id_to_exclude)
-    
-    potential_dependencies = query.all()
 
     found_dependencies = []
-    remaining_conditions_set = all_conditions_set.copy()
+    remaining_conditions_set = all_conditions_set
 
-    for existing_rule in potential_dependencies:
+    # Any candidate whose bitmap has a bit outside the query bitmap cannot
+    # be a subset; cheap vectorized reject before the exact set check.
+    not_query_bitmap = np.bitwise_not(_condition_bitmap(all_conditions_set))
+
+    for rule_id, updated_at, conditions in query.yield_per(100):
         # No point in checking if we have no conditions left to match
         if not remaining_conditions_set:
             break
 
-        existing_conditions_set = _conditions_to_set(existing_rule.conditions)
+        cached = _rule_bitmap_cache.get(rule_id)
+        if cached is None or cached[0] != updated_at:
+            conditions_set = _conditions_to_set(conditions)
+            bitmap = _condition_bitmap(conditions_set) if conditions_set else None
+            cached = (updated_at, conditions_set, bitmap)
+            _rule_bitmap_cache[rule_id] = cached
+        _, existing_conditions_set, rule_bitmap = cached
+
         if not existing_conditions_set:
             continue
 
+        # Candidates arrive sorted by size descending, so once the matched
+        # conditions shrink `remaining` below a candidate's size, that
+        # candidate (and any same-sized one) can't be a subset — skip the
+        # probe without touching the bitmap or the sets.
+        if len(existing_conditions_set) > len(remaining_conditions_set):
+            continue
+
+        if np.bitwise_and(rule_bitmap, not_query_bitmap).any():
+            continue
+
         # Check if the existing rule is a proper subset of the *remaining* conditions
         if existing_conditions_set.issubset(remaining_conditions_set):
-            logger.info(f"Found dependency match: Rule {existing_rule.id} covers {len(existing_conditions_set)} conditions.")
-            found_dependencies.append(existing_rule.id)
+            logger.info(f"Found dependency match: Rule {rule_id} covers {len(existing_conditions_set)} conditions.")
+            found_dependencies.append(rule_id)
             remaining_conditions_set -= existing_conditions_set
 
     # We only create a compound rule if we found at least one dependency
@@ -1,23 +1,73 @@
-from flask import jsonify
+from flask import Response, jsonify, stream_with_context
+
+import orjson
+
+def paginated_response(query, id_column, schema=None, after_id=0, per_page=20):
+    """Generate a keyset-paginated response for a SQLAlchemy query.
+
+    Seeks past ``after_id`` on the primary key instead of OFFSET, so page
+    cost stays O(per_page) at any depth and no COUNT(*) is issued. Clients
+    pass the returned ``next_cursor`` back as ``after_id``; a null cursor
+    means the last page.
+    """
+    items = (query.filter(id_column > after_id)
+             .order_by(id_column)
+             .limit(per_page + 1)
+             .all())
+    has_next = len(items) > per_page
+    items = items[:per_page]
+    next_cursor = items[-1].id if has_next else None
 
-def paginated_response(query, schema=None, page=1, per_page=20):
-    """Generate a paginated response for a SQLAlchemy query."""
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    items = pagination.items
-    
     if schema:
         items = [schema.dump(item) for item in items]
     else:
-        items = [item.to_dict() for item in items]
-    
+        # Column-tuple rows (with_entities queries) convert via _asdict
+        # without any model hydration; ORM objects fall back to to_dict.
+        items = [item._asdict() if hasattr(item, '_asdict') else item.to_dict()
+                 for item in items]
+
     return {
         'items': items,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page,
+        'next_cursor': next_cursor,
         'per_page': per_page
     }
 
+def paginated_streaming_response(query, id_column, schema=None, after_id=0, per_page=20):
+    """Streaming variant of :func:`paginated_response`.
+
+    Rows come off a server-side cursor and are serialized one at a time,
+    so the page is never held fully materialized — serialization overlaps
+    the database fetch. Same keyset contract: the body carries
+    ``next_cursor`` for the client to pass back as ``after_id``.
+    """
+    rows = (query.filter(id_column > after_id)
+            .order_by(id_column)
+            .limit(per_page + 1)
+            .execution_options(stream_results=True)
+            .yield_per(per_page))
+
+    def generate():
+        yield b'{"items":['
+        last_id = None
+        emitted = 0
+        has_next = False
+        for row in rows:
+            if emitted == per_page:
+                # The sentinel (per_page+1)-th row only signals a next page.
+                has_next = True
+                break
+            item = (schema.dump(row) if schema
+                    else row._asdict() if hasattr(row, '_asdict')
+                    else row.to_dict())
+            yield (b',' if emitted else b'') + orjson.dumps(item)
+            last_id = row.id
+            emitted += 1
+        next_cursor = last_id if has_next else None
+        yield (b'],"next_cursor":' + orjson.dumps(next_cursor)
+               + b',"per_page":' + str(per_page).encode() + b'}')
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 def success_response(data, status_code=200):
     """Return a success response with the given data."""
     return jsonify({
@@ -30,4 +80,4 @@ def error_response(message, status_code=400):
     return jsonify({
         'status': 'error',
         'message': message
-    }), status_code
\ No newline at end of file
+    }), status_code
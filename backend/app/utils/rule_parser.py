@@ -1,7 +1,11 @@
 # app/utils/rule_parser.py
 import logging
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, Any, List, Tuple
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
 class RuleParser:
@@ -9,15 +13,35 @@ class RuleParser:
     Parses rule conditions from a list of condition objects and generates an efficient SQL query.
     """
 
-    FIELD_TO_COLUMN_MAP = {
+    # Lookup structures are built once at import and kept immutable; the
+    # per-call work below is pure dict/set probes.
+    FIELD_TO_COLUMN_MAP = MappingProxyType({
         'transaction_amount': 'amount',
         'city_tier': 'city_tier',
         'transaction_date': 'transaction_date',
         'total_spend': 'total_spent',
         'transaction_count': 'total_transactions'
-    }
+    })
+
+    AGGREGATE_FIELDS = frozenset(['total_spend', 'transaction_count'])
 
-    AGGREGATE_FIELDS = ['total_spend', 'transaction_count']
+    ALLOWED_OPERATORS = frozenset(['>', '<', '=', '>=', '<=', '!=', 'IN', 'NOT IN', 'BETWEEN'])
+
+    @staticmethod
+    def _sql_literal(value: Any) -> str:
+        """Renders a condition value as a safe SQL literal.
+
+        The generated SQL must stay self-contained — it's stored in
+        segment_catalog and later embedded in Spark JDBC reads and
+        CREATE TABLE AS statements where bind parameters can't follow —
+        so string values are quote-escaped instead of parameterized.
+        """
+        if isinstance(value, bool):
+            return '1' if value else '0'
+        if isinstance(value, (int, float)):
+            return str(value)
+        escaped = str(value).replace("'", "''")
+        return f"'{escaped}'"
 
     @staticmethod
     def _parse_to_clauses(conditions: List[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
@@ -47,8 +71,7 @@ class RuleParser:
                 logger.warning(f"Skipping malformed condition: {condition}")
                 continue
 
-            allowed_operators = ['>', '<', '=', '>=', '<=', '!=', 'IN', 'NOT IN', 'BETWEEN']
-            if operator.upper() not in allowed_operators:
+            if operator.upper() not in RuleParser.ALLOWED_OPERATORS:
                 logger.warning(f"Skipping condition with invalid operator: {operator}")
                 continue
 
@@ -62,20 +85,14 @@ class RuleParser:
                 if value2 is None:
                     logger.warning(f"Skipping BETWEEN operator with missing second value: {condition}")
                     continue
-                sql_value1 = f"'{value}'"
-                sql_value2 = f"'{value2}'"
+                sql_value1 = RuleParser._sql_literal(value)
+                sql_value2 = RuleParser._sql_literal(value2)
                 clause = f"{column_name} BETWEEN {sql_value1} AND {sql_value2}"
             else:
-                sql_value = f"'{value}'" if isinstance(value, str) else str(value)
+                sql_value = RuleParser._sql_literal(value)
                 if operator.upper() in ['IN', 'NOT IN']:
                     if isinstance(value, list) and value:
-                        formatted_values = []
-                        for v in value:
-                            if isinstance(v, (int, float)):
-                                formatted_values.append(str(v))
-                            else:
-                                formatted_values.append(f"'{v}'")
-                        sql_value = f"({', '.join(formatted_values)})"
+                        sql_value = f"({', '.join(RuleParser._sql_literal(v) for v in value)})"
                     else:
                         logger.warning(f"Skipping IN/NOT IN operator with non-list or empty value: {value}")
                         continue
@@ -97,7 +114,18 @@ class RuleParser:
     def generate_segment_sql(rule_id: int, conditions: List[Dict[str, Any]]) -> str:
         """
         Generates an efficient SQL query to create a user segment.
+
+        Results are memoized per (rule_id, canonical conditions) so repeat
+        calls with unchanged conditions (e.g. a PUT that only edits the
+        description) skip the parse entirely.
         """
+        conditions_key = orjson.dumps(conditions, option=orjson.OPT_SORT_KEYS)
+        return RuleParser._generate_segment_sql_cached(rule_id, conditions_key)
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _generate_segment_sql_cached(rule_id: int, conditions_key: bytes) -> str:
+        conditions = orjson.loads(conditions_key)
         logger.info(f"Generating SQL for Rule ID: {rule_id} with conditions: {conditions}")
 
         base_query = """
@@ -5,6 +5,10 @@ class Config:
     """Base configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-123'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Oversize the compiled-statement cache (default 500) so the hot
+    # parametrized rule/segment lookups never fall out and recompile.
+    SQLALCHEMY_ENGINE_OPTIONS = {'query_cache_size': 1200}
+    REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
     DEBUG = False
     TESTING = False
 
@@ -13,6 +17,19 @@ class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + abspath(join(dirname(__file__), 'db', 'audience_manager.db'))
     SQLALCHEMY_ECHO = True  # Log SQL queries
+    # Size the pool for the threaded server: pool_size + max_overflow must
+    # cover every waitress thread doing DB work at once, otherwise requests
+    # queue on connection checkout. pre_ping/recycle guard against stale
+    # handles surviving a WAL checkpoint or restart. Not set on the base
+    # class because the in-memory test database uses SingletonThreadPool,
+    # which rejects sizing arguments.
+    SQLALCHEMY_ENGINE_OPTIONS = dict(
+        Config.SQLALCHEMY_ENGINE_OPTIONS,
+        pool_size=10,
+        max_overflow=20,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
 
 class TestingConfig(Config):
     """Testing configuration"""
@@ -1,4 +1,6 @@
 import os
+from functools import lru_cache
+
 import pandas as pd
 from sqlalchemy import create_engine, text
 
@@ -7,9 +9,15 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'db', 'audience_manager.db')
 DB_URI = f'sqlite:///{DB_PATH}'
 
-def get_sql_query(engine, rule_id):
-    """Fetch the SQL query for a given rule_id."""
-    with engine.connect() as connection:
+@lru_cache(maxsize=1)
+def get_engine():
+    """Create (once) and return the debug engine."""
+    return create_engine(DB_URI)
+
+@lru_cache(maxsize=32)
+def get_sql_query(rule_id):
+    """Fetch the SQL query for a given rule_id (memoized per rule)."""
+    with get_engine().connect() as connection:
         result = connection.execute(
             text("SELECT sql_query FROM segment_catalog WHERE rule_id = :rule_id"),
             {'rule_id': rule_id}
@@ -27,36 +35,47 @@ def run_debug():
         print("ERROR: Database file not found!")
         return
 
-    engine = create_engine(DB_URI)
-    
+    engine = get_engine()
+
     try:
         # 1. Fetch the query
         rule_id = 1
-        sql_query = get_sql_query(engine, rule_id)
+        sql_query = get_sql_query(rule_id)
 
         if not sql_query:
             print(f"ERROR: No SQL query found for rule_id {rule_id}")
             return
-            
+
         print("--- SQL Query ---")
         print(sql_query)
         print("-----------------")
 
-        # 2. Execute the query using pandas
+        # 2. Execute the query with pandas in chunks off a streaming
+        # cursor: memory stays bounded by the chunksize instead of the
+        # result size, which matters for multi-million-row segments
+        # when all we print is the count and a sample.
         print("Executing query with pandas...")
-        df = pd.read_sql_query(sql_query, engine)
+        row_count = 0
+        sample = None
+        with engine.connect().execution_options(stream_results=True) as connection:
+            for chunk in pd.read_sql_query(text(sql_query), connection, chunksize=10_000):
+                row_count += len(chunk)
+                if sample is None:
+                    sample = chunk.head()
 
         # 3. Print results
         print(f"\n--- Results ---")
-        print(f"Number of rows returned: {len(df)}")
-        
-        if not df.empty:
+        print(f"Number of rows returned: {row_count}")
+
+        if sample is not None and not sample.empty:
             print("Sample data:")
-            print(df.head())
+            print(sample)
         print("---------------")
 
     except Exception as e:
         print(f"An error occurred: {e}")
+    finally:
+        engine.dispose()
 
 if __name__ == "__main__":
     run_debug()
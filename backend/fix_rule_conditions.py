@@ -1,4 +1,3 @@
-import json
 import logging
 from app import create_app
 from app.models.rule_engine import Rule
@@ -27,14 +26,25 @@ def main():
         logger.info("Starting to fix rule conditions...")
 
         try:
-            for rule_id, conditions in rule_definitions.items():
-                rule = db.session.query(Rule).filter_by(id=rule_id).first()
-                if rule:
-                    logger.info(f"Updating conditions for Rule ID: {rule_id} ({rule.rule_name})")
-                    rule.conditions = json.dumps(conditions)
-                else:
-                    logger.warning(f"Rule ID: {rule_id} not found. Skipping.")
-            
+            # One SELECT to learn which rules exist, one bulk UPDATE for
+            # all of them — instead of a SELECT + flush per rule.
+            existing_ids = {rid for (rid,) in
+                            db.session.query(Rule.id)
+                            .filter(Rule.id.in_(rule_definitions)).all()}
+            for rule_id in rule_definitions.keys() - existing_ids:
+                logger.warning(f"Rule ID: {rule_id} not found. Skipping.")
+
+            # The conditions column is db.JSON now, so the dicts go in
+            # as-is; json.dumps here would double-encode them.
+            mappings = [
+                {'id': rule_id, 'conditions': conditions}
+                for rule_id, conditions in rule_definitions.items()
+                if rule_id in existing_ids
+            ]
+            if mappings:
+                logger.info(f"Updating conditions for Rule IDs: {sorted(m['id'] for m in mappings)}")
+                db.session.bulk_update_mappings(Rule, mappings)
+
             db.session.commit()
             logger.info("✅ Successfully updated rule conditions.")
 
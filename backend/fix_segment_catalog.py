@@ -41,12 +41,14 @@ def fix_segment_catalog():
         else:
             print("segment_catalog table exists, checking schema...")
             
-            # Get current columns
-            columns = {col['name'] for col in inspector.get_columns('segment_catalog')}
-            print(f"Current columns: {', '.join(columns)}")
-            
+            # sqlite_master caches the CREATE statement; a single substring
+            # test replaces iterating PRAGMA table_info metadata rows.
+            create_sql = db.session.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type='table' AND name='segment_catalog'"
+            )).scalar() or ''
+
             # Check if we need to add sql_query column
-            if 'sql_query' not in columns:
+            if 'sql_query' not in create_sql:
                 print("Adding sql_query column...")
                 try:
                     # Get existing data
@@ -84,14 +86,14 @@ def fix_segment_catalog():
                         row.setdefault('is_active', 1)
                         row.setdefault('target_table', '')
                         
-                        # Prepare columns and values
-                        columns = [col for col in row.keys() if col != 'id' or 'id' not in columns]
-                        placeholders = ', '.join(['?'] * len(columns))
-                        values = [row[col] for col in columns]
-                        
+                        # Prepare columns and values from the row itself;
+                        # id is left out so the new table renumbers it.
+                        columns = [col for col in row.keys() if col != 'id']
+                        placeholders = ', '.join(f':{col}' for col in columns)
+
                         # Build and execute the insert statement
                         sql = f"INSERT INTO segment_catalog_new ({', '.join(columns)}) VALUES ({placeholders})"
-                        db.session.execute(text(sql), values)
+                        db.session.execute(text(sql), {col: row[col] for col in columns})
                     
                     # Drop the old table and rename the new one
                     db.session.execute(text('DROP TABLE segment_catalog'))
@@ -0,0 +1,82 @@
+import logging
+import sys
+from pathlib import Path
+
+# Make the backend package importable when run as a standalone script
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app import create_app
+from sqlalchemy import text
+
+# Configure logger
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Bump when a new migration step is appended below.
+SCHEMA_VERSION = 1
+
+def main():
+    """
+    Adds 'depends_on' (JSON TEXT) and 'operation' (TEXT) columns to the
+    'segment_catalog' table and the lookup indexes, replacing the previous
+    add_dependency_columns.py / add_lineage_columns.py pair.
+
+    PRAGMA user_version gates the whole step: once a deployment has run it,
+    later runs return after a single PRAGMA read instead of re-opening a
+    transaction and probing table_info.
+    """
+    app = create_app()
+    with app.app_context():
+        from app import db
+
+        try:
+            with db.engine.connect() as connection:
+                version = connection.execute(text("PRAGMA user_version;")).scalar()
+                if version >= SCHEMA_VERSION:
+                    logger.info(f"Schema already at version {version}; nothing to do.")
+                    return
+
+                logger.info("Starting database schema migration for segment dependencies...")
+
+                # Tune the journal before opening the transaction so all
+                # DDL statements share a single commit fsync.
+                connection.execute(text("PRAGMA journal_mode=WAL;"))
+                connection.execute(text("PRAGMA synchronous=NORMAL;"))
+                # Close the implicit transaction the PRAGMAs autobegin
+                connection.commit()
+
+                trans = connection.begin()
+                for ddl, column in (
+                    ("ALTER TABLE segment_catalog ADD COLUMN depends_on TEXT;", 'depends_on'),
+                    ("ALTER TABLE segment_catalog ADD COLUMN operation TEXT;", 'operation'),
+                ):
+                    try:
+                        connection.execute(text(ddl))
+                        logger.info(f" -> Added '{column}' column to 'segment_catalog'.")
+                    except Exception as e:
+                        if "duplicate column name" in str(e):
+                            logger.info(f" -> '{column}' column already exists.")
+                        else:
+                            raise
+
+                # Indexes backing the hot lookups: segment-by-rule fetches,
+                # the rule_name uniqueness check in create_rule, and the
+                # scheduler's is_active/next_run_at wake-up query.
+                for index_ddl in (
+                    "CREATE INDEX IF NOT EXISTS ix_segment_catalog_rule_id ON segment_catalog (rule_id);",
+                    "CREATE UNIQUE INDEX IF NOT EXISTS ix_rule_table_rule_name ON rule_table (rule_name);",
+                    "CREATE INDEX IF NOT EXISTS ix_rule_active_next ON rule_table (is_active, next_run_at);",
+                ):
+                    connection.execute(text(index_ddl))
+                logger.info(" -> Ensured lookup indexes on 'segment_catalog' and 'rule_table'.")
+
+                connection.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION};"))
+                trans.commit()
+
+            logger.info("✅ Database schema migration completed successfully.")
+
+        except Exception as e:
+            logger.error(f"A critical error occurred during the migration: {e}", exc_info=True)
+
+if __name__ == "__main__":
+    main()
@@ -4,4 +4,6 @@ from app import create_app
 app = create_app()
 
 if __name__ == '__main__':
-    serve(app, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Threads sized to stay under the DB pool ceiling (10 + 20 overflow)
+    # so no request ever blocks waiting for a connection checkout.
+    serve(app, host='0.0.0.0', port=5000, threads=16)
\ No newline at end of file